@@ -0,0 +1,71 @@
+"""CPU-heavy image work run in the image worker processes
+
+Kept outside of `src`, as importing anything under it starts up the whole bot
+"""
+
+import io
+
+
+def _open(img_b: bytes, /):
+    from PIL import Image as pil_img
+
+    return pil_img.open(io.BytesIO(img_b))
+
+
+def shrink_img(img_b: bytes, limit_size: int, /) -> bytes:
+    import numpy as np
+
+    resize = np.sqrt(len(img_b) / limit_size)
+    img = _open(img_b)
+    fmt = img.format
+    img = img.resize((*(int(d / resize) for d in img.size),))
+    img.save(b := io.BytesIO(), fmt)
+    return b.getvalue()
+
+
+def compute_img_palette(
+    img_b: bytes,
+    n: int,
+    resize: tuple[int, int],
+    bits: int,
+    min_dist: float,
+    /,
+) -> tuple[tuple[int, int, int], ...]:
+    import numpy as np
+
+    img = _open(img_b).convert('RGB')
+    ## optional, to reduce time
+    ar = np.asarray(img.resize(resize)).reshape(-1, 3)
+
+    ## bin every pixel into a coarse (2^bits)^3 color cube
+    q = ar >> (8 - bits)
+    bins = (q[:, 0].astype(np.int32) << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+    size = 1 << (3 * bits)
+    counts = np.bincount(bins, minlength=size)
+    sums = np.stack(
+        [np.bincount(bins, weights=ar[:, c], minlength=size) for c in range(3)], 1
+    )
+
+    ## average color of each occupied bin, in order of dominance
+    occupied = np.flatnonzero(counts)
+    occupied = occupied[np.argsort(counts[occupied])[::-1]]
+    means = sums[occupied] / counts[occupied, None]
+
+    ## skip bins too close to an already picked more dominant color
+    picked: list[int] = []
+    for i, c in enumerate(means):
+        if all(np.linalg.norm(c - means[j]) >= min_dist for j in picked):
+            picked.append(i)
+            if len(picked) == n:
+                break
+    for i in range(len(means)):
+        if len(picked) == n:
+            break
+        if i not in picked:
+            picked.append(i)
+    while len(picked) < n:
+        picked.append(picked[-1])
+
+    return (
+        *((*(int(round(v)) for v in means[i]),) for i in picked),
+    )  ## returns colors in order of dominance
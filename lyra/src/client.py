@@ -12,14 +12,20 @@ import lavasnek_rs as lv
 import src.lib.globs as globs
 
 from .lib import (
+    AsyncCollection,
     EventHandler,
+    GuildConfigCache,
+    LavalinkPool,
     LyraDBClientType,
-    LyraDBCollectionType,
+    PoolNode,
+    UnplayableTracks,
     repeat_emojis,
     EmojiRefs,
     base_h,
+    close_http_session,
     restricts_c,
     inj_glob,
+    invalidate_permissions,
     lgfmt,
 )
 from .lib.dataimpl import init_mongo_client
@@ -41,6 +47,7 @@ with open(fn.resolve(), 'r') as f:
 
     decl_glob_cmds: list[int] | t.Literal[True] = _d['guilds'] if _dev else True
     emoji_guild: int = _d['emoji_guild']
+    lavalink_nodes: list[dict[str, t.Any]] = _d.get('lavalink_nodes') or []
 
 _client = globs.init_client(
     tj.Client.from_gateway_bot(
@@ -64,19 +71,14 @@ emoji_refs = EmojiRefs({})
 @_client.with_prefix_getter
 async def prefix_getter(
     ctx: tj.abc.MessageContext,
-    cfg: al.Injected[al.Injected[LyraDBCollectionType]],
+    cfg: al.Injected[GuildConfigCache],
 ) -> t.Iterable[str]:
-    g_id = str(ctx.guild_id)
-    flt = {'id': g_id}
+    if not ctx.guild_id:
+        return []
 
-    # pyright: reportUnknownMemberType=false
-    if _g_cfg := cfg.find_one(flt):
-        g_cfg = _g_cfg
-    else:
-        cfg.insert_one(flt)
-        g_cfg: dict[str, t.Any] = flt.copy()
+    g_cfg = await cfg.get(ctx.guild_id)
 
-    prefixes: list[str] = g_cfg.setdefault('prefixes', []) if ctx.guild_id else []
+    prefixes: list[str] = g_cfg.setdefault('prefixes', [])
     return prefixes
 
 
@@ -94,15 +96,47 @@ async def on_started(
     prefs_db = mongo_client.get_database('prefs')
     guilds_co = prefs_db.get_collection('guilds')
 
+    internal_db = mongo_client.get_database('internal')
+    upt = UnplayableTracks(
+        AsyncCollection(internal_db.get_collection('unplayable-tracks'))
+    )
+    await upt.load()
+
     (
         client.set_type_dependency(LyraDBClientType, mongo_client)
-        .set_type_dependency(LyraDBCollectionType, guilds_co)
+        .set_type_dependency(
+            GuildConfigCache, GuildConfigCache(AsyncCollection(guilds_co))
+        )
+        .set_type_dependency(UnplayableTracks, upt)
         .set_type_dependency(EmojiRefs, emoji_refs)
     )
 
     repeat_emojis.extend(emoji_refs[f'repeat{n}_b'] for n in range(3))
 
 
+@_client.with_listener(hk.StoppingEvent)
+async def on_stopping(_: hk.StoppingEvent) -> None:
+    await close_http_session()
+
+
+@_client.with_listener(hk.RoleUpdateEvent)
+@_client.with_listener(hk.RoleDeleteEvent)
+@_client.with_listener(hk.MemberUpdateEvent)
+@_client.with_listener(hk.GuildChannelUpdateEvent)
+@_client.with_listener(hk.GuildChannelDeleteEvent)
+async def on_permissions_update(
+    event: hk.RoleEvent | hk.MemberEvent | hk.GuildChannelEvent,
+) -> None:
+    """Drops the cached permissions that the event might have changed."""
+
+    if isinstance(event, hk.MemberEvent):
+        invalidate_permissions(event.guild_id, member=event.user_id)
+    elif isinstance(event, hk.GuildChannelEvent):
+        invalidate_permissions(event.guild_id, channel=event.channel_id)
+    else:
+        invalidate_permissions(event.guild_id)
+
+
 @_client.with_listener(hk.ShardReadyEvent)
 async def on_shard_ready(
     event: hk.ShardReadyEvent,
@@ -116,17 +150,31 @@ async def on_shard_ready(
         else '127.0.0.1'
     )
 
-    builder = (
-        lv.LavalinkBuilder(event.my_user.id, TOKEN)
-        .set_host(host)
-        .set_password(os.environ['LAVALINK_PWD'])
-        .set_port(int(os.environ['LAVALINK_PORT']))
-        .set_start_gateway(False)
-    )
+    nodes: list[PoolNode] = []
+    for node_cfg in lavalink_nodes or [{}]:
+        node_host: str = node_cfg.get('host', host)
+        node_port = int(node_cfg.get('port', os.environ['LAVALINK_PORT']))
+        builder = (
+            lv.LavalinkBuilder(event.my_user.id, TOKEN)
+            .set_host(node_host)
+            .set_password(node_cfg.get('password', os.environ['LAVALINK_PWD']))
+            .set_port(node_port)
+            .set_start_gateway(False)
+        )
+
+        handler = EventHandler()
+        lvc = await builder.build(handler)
+        handler.node = node = PoolNode(
+            node_cfg.get('name', f'{node_host}:{node_port}'), lvc
+        )
+        nodes.append(node)
 
-    lvc = await builder.build(EventHandler())
+    pool = LavalinkPool(nodes)
+    pool.start_monitoring()
 
-    client.set_type_dependency(lv.Lavalink, lvc)
+    client.set_type_dependency(LavalinkPool, pool)
+    # The pool stands in for a single node wherever `lv.Lavalink` is injected
+    client.set_type_dependency(lv.Lavalink, pool)
 
 
 @_client.with_listener(hk.VoiceStateUpdateEvent)
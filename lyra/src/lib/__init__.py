@@ -1,6 +1,6 @@
 # pyright: reportUnusedImport=false
-from .extras import inj_glob, lgfmt
-from .utils import EmojiRefs, base_h, restricts_c
+from .extras import close_http_session, inj_glob, lgfmt
+from .utils import EmojiRefs, base_h, invalidate_permissions, restricts_c
 from .music import cleanup
 from .errors import NotConnected
 from .lavautils import (
@@ -10,4 +10,11 @@ from .lavautils import (
     repeat_emojis,
 )
 from .lavaimpl import EventHandler
-from .dataimpl import LyraDBClientType, LyraDBCollectionType
+from .lavapool import LavalinkPool, PoolNode
+from .dataimpl import (
+    AsyncCollection,
+    GuildConfigCache,
+    LyraDBClientType,
+    LyraDBCollectionType,
+    UnplayableTracks,
+)
@@ -0,0 +1,356 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import typing as t
+import asyncio
+import sqlite3
+import threading
+import functools as ft
+import collections as cl
+
+import attr as a
+
+from ._extras_types import Option
+
+
+_K = t.TypeVar('_K', bound=t.Hashable)
+_V = t.TypeVar('_V')
+
+
+@a.define
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+@a.define
+class TTLCache(t.Generic[_K, _V]):
+    """A least-recently-used mapping whose entries also expire after `ttl` seconds"""
+
+    max_size: int = 1024
+    ttl: Option[float] = None
+    stats: CacheStats = a.field(factory=CacheStats, init=False)
+    _data: cl.OrderedDict[_K, tuple[float, _V]] = a.field(
+        factory=cl.OrderedDict, init=False, repr=False
+    )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: _K) -> bool:
+        return self.get(key, count=False) is not None
+
+    def _expired(self, stamp: float, /) -> bool:
+        return self.ttl is not None and time.monotonic() - stamp > self.ttl
+
+    def get(self, key: _K, /, *, count: bool = True) -> Option[_V]:
+        if (entry := self._data.get(key)) is None:
+            if count:
+                self.stats.misses += 1
+            return None
+        stamp, value = entry
+        if self._expired(stamp):
+            del self._data[key]
+            if count:
+                self.stats.misses += 1
+                self.stats.evictions += 1
+            return None
+        self._data.move_to_end(key)
+        if count:
+            self.stats.hits += 1
+        return value
+
+    def set(self, key: _K, value: _V, /) -> None:
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: _K, /) -> Option[_V]:
+        if (entry := self._data.pop(key, None)) is None:
+            return None
+        return entry[1]
+
+    def pop_where(self, predicate: t.Callable[[_K], bool], /) -> None:
+        for key in [*filter(predicate, self._data)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+def sizeof(obj: t.Any, /) -> int:
+    """Roughly how many bytes `obj` keeps alive, counting decoded images by their pixel buffers"""
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj.encode())
+    if isinstance(obj, (tuple, list, frozenset, set)):
+        return sys.getsizeof(obj) + sum(sizeof(o) for o in t.cast(t.Iterable[t.Any], obj))
+    if hasattr(obj, 'getbands') and hasattr(obj, 'size'):
+        w, h = obj.size
+        return w * h * len(obj.getbands())
+    return sys.getsizeof(obj)
+
+
+@a.define
+class SizedLRUCache(t.Generic[_K, _V]):
+    """A least-recently-used mapping bounded by the total `sizeof` of its keys and values rather than by its length"""
+
+    max_bytes: int
+    stats: CacheStats = a.field(factory=CacheStats, init=False)
+    _data: cl.OrderedDict[_K, tuple[int, _V]] = a.field(
+        factory=cl.OrderedDict, init=False, repr=False
+    )
+    _bytes: int = a.field(default=0, init=False)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: _K, /) -> Option[_V]:
+        if (entry := self._data.get(key)) is None:
+            self.stats.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    def set(self, key: _K, value: _V, /) -> None:
+        self.pop(key)
+        if (size := sizeof(key) + sizeof(value)) > self.max_bytes:
+            return
+        self._data[key] = (size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (evicted, _) = self._data.popitem(last=False)
+            self._bytes -= evicted
+            self.stats.evictions += 1
+
+    def pop(self, key: _K, /) -> Option[_V]:
+        if (entry := self._data.pop(key, None)) is None:
+            return None
+        self._bytes -= entry[0]
+        return entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+
+_P = t.ParamSpec('_P')
+_R = t.TypeVar('_R')
+
+
+class _Cache(t.Protocol):
+    def get(self, key: t.Any, /) -> t.Any:
+        ...
+
+    def set(self, key: t.Any, value: t.Any, /) -> None:
+        ...
+
+
+def _make_cache(
+    max_size: int, ttl: Option[float], max_bytes: Option[int], /
+) -> _Cache:
+    if max_bytes is not None:
+        return SizedLRUCache(max_bytes)
+    return TTLCache(max_size, ttl)
+
+
+@a.define
+class SingleflightCache(t.Generic[_K, _V]):
+    """Loads each missing key once, however many callers ask for it at the same time, and caches the results that `keep` accepts"""
+
+    cache: TTLCache[_K, _V]
+    keep: t.Callable[[_V], bool] = lambda _: True
+    _inflight: dict[_K, asyncio.Future[_V]] = a.field(factory=dict, init=False)
+
+    async def get(self, key: _K, loader: t.Callable[[], t.Awaitable[_V]], /) -> _V:
+        if (cached := self.cache.get(key)) is not None:
+            return cached
+
+        if (inflight := self._inflight.get(key)) is None:
+            inflight = self._inflight[key] = asyncio.ensure_future(loader())
+
+            def _settle(fut: asyncio.Future[_V], /):
+                del self._inflight[key]
+                if fut.cancelled() or fut.exception():
+                    return
+                if self.keep(result := fut.result()):
+                    self.cache.set(key, result)
+
+            inflight.add_done_callback(_settle)
+
+        # Shielded so that one waiter cancelling does not cancel the shared load
+        return await asyncio.shield(inflight)
+
+
+def _make_key(
+    key: Option[t.Callable[..., t.Hashable]],
+    args: tuple[t.Any, ...],
+    kwargs: dict[str, t.Any],
+    /,
+) -> t.Hashable:
+    return key(*args, **kwargs) if key else (args, (*sorted(kwargs.items()),))
+
+
+def digest_key(data: bytes, /, *args: t.Any, **kwargs: t.Any) -> t.Hashable:
+    """A cache key for functions taking large bytes first, so the cache does not keep those bytes alive"""
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    return (digest, args, (*sorted(kwargs.items()),))
+
+
+def cached(
+    max_size: int = 1024,
+    ttl: Option[float] = None,
+    *,
+    max_bytes: Option[int] = None,
+    key: Option[t.Callable[..., t.Hashable]] = None,
+) -> t.Callable[[t.Callable[_P, _R]], t.Callable[_P, _R]]:
+    """Memoizes a function's results in a `TTLCache`, or a `SizedLRUCache` if `max_bytes` is given, keyed by its arguments or by `key(*args, **kwargs)`"""
+
+    def decorator(func: t.Callable[_P, _R], /) -> t.Callable[_P, _R]:
+        cache = _make_cache(max_size, ttl, max_bytes)
+
+        @ft.wraps(func)
+        def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _R:
+            k = _make_key(key, args, kwargs)
+            if (hit := cache.get(k)) is not None:
+                return hit[0]
+            result = func(*args, **kwargs)
+            cache.set(k, (result,))
+            return result
+
+        setattr(wrapper, 'cache', cache)
+        return wrapper
+
+    return decorator
+
+
+def acached(
+    max_size: int = 1024,
+    ttl: Option[float] = None,
+    *,
+    max_bytes: Option[int] = None,
+    key: Option[t.Callable[..., t.Hashable]] = None,
+) -> t.Callable[
+    [t.Callable[_P, t.Awaitable[_R]]], t.Callable[_P, t.Coroutine[t.Any, t.Any, _R]]
+]:
+    """Like `cached`, but for coroutine functions"""
+
+    def decorator(
+        func: t.Callable[_P, t.Awaitable[_R]], /
+    ) -> t.Callable[_P, t.Coroutine[t.Any, t.Any, _R]]:
+        cache = _make_cache(max_size, ttl, max_bytes)
+
+        @ft.wraps(func)
+        async def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _R:
+            k = _make_key(key, args, kwargs)
+            if (hit := cache.get(k)) is not None:
+                return hit[0]
+            result = await func(*args, **kwargs)
+            cache.set(k, (result,))
+            return result
+
+        setattr(wrapper, 'cache', cache)
+        return wrapper
+
+    return decorator
+
+
+@a.define
+class SQLiteCache:
+    """A JSON key-value store persisted to an SQLite file, which evicts the least recently used rows beyond `max_rows`
+
+    Reads are served from an in-memory LRU of `memo_size` entries first, and their recency is written back in batches of `touch_batch`
+    """
+
+    path: str
+    max_rows: int = 50_000
+    memo_size: int = 4096
+    touch_batch: int = 256
+    _conn: Option[sqlite3.Connection] = a.field(default=None, init=False, repr=False)
+    _lock: threading.Lock = a.field(factory=threading.Lock, init=False, repr=False)
+    ## Values are kept as 1-tuples, and known misses as empty ones
+    _memo: TTLCache[str, tuple[t.Any, ...]] = a.field(init=False, repr=False)
+    _touched: dict[str, float] = a.field(factory=dict, init=False, repr=False)
+
+    @_memo.default  # pyright: ignore
+    def _memo_default(self) -> TTLCache[str, tuple[t.Any, ...]]:
+        return TTLCache(self.memo_size)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_used ON cache (used)')
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key: str, /) -> t.Any:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+            return None if row is None else json.loads(row[0])
+
+    def _touch_rows(self, conn: sqlite3.Connection, touched: dict[str, float], /):
+        conn.executemany(
+            'UPDATE cache SET used = ? WHERE key = ?',
+            ((used, key) for key, used in touched.items()),
+        )
+
+    def _flush(self, touched: dict[str, float], /) -> None:
+        with self._lock, self._connect() as conn:
+            self._touch_rows(conn, touched)
+
+    def _set(self, key: str, value: t.Any, touched: dict[str, float], /) -> None:
+        with self._lock, self._connect() as conn:
+            self._touch_rows(conn, touched)
+            conn.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time()),
+            )
+            (count,) = conn.execute('SELECT COUNT(*) FROM cache').fetchone()
+            if (excess := count - self.max_rows) > 0:
+                conn.execute(
+                    'DELETE FROM cache WHERE key IN '
+                    '(SELECT key FROM cache ORDER BY used LIMIT ?)',
+                    (excess,),
+                )
+
+    def _take_touched(self) -> dict[str, float]:
+        touched, self._touched = self._touched, {}
+        return touched
+
+    async def get(self, key: str, /) -> t.Any:
+        if (hit := self._memo.get(key)) is None:
+            value = await asyncio.to_thread(self._get, key)
+            self._memo.set(key, () if value is None else (value,))
+        elif hit:
+            value = hit[0]
+        else:
+            return None
+
+        if value is not None:
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                await asyncio.to_thread(self._flush, self._take_touched())
+        return value
+
+    async def set(self, key: str, value: t.Any, /) -> None:
+        self._memo.set(key, (value,))
+        await asyncio.to_thread(self._set, key, value, self._take_touched())
@@ -0,0 +1,80 @@
+import typing as t
+import asyncio
+
+import aiohttp
+
+from ._extras_types import Option, URLstr
+from .consts import HTTP_CONN_LIMIT, HTTP_TIMEOUT, RETRIES
+
+
+_T = t.TypeVar('_T')
+
+_session: Option[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Returns the shared, keep-alive HTTP session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_CONN_LIMIT, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+            headers={'User-Agent': "Magic Browser"},
+        )
+    return _session
+
+
+async def close_http_session() -> None:
+    if _session and not _session.closed:
+        await _session.close()
+
+
+async def _retrying(request: t.Callable[[], t.Awaitable[_T]], /) -> _T:
+    for i in range(RETRIES):
+        try:
+            return await request()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if i == RETRIES - 1:
+                raise
+            await asyncio.sleep(0.25 * 2**i)
+    raise RuntimeError("Unreachable")
+
+
+async def fetch_bytes(url: URLstr, /, *, headers: Option[dict[str, str]] = None):
+    async def _get() -> bytes:
+        async with get_http_session().get(url, headers=headers) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    return await _retrying(_get)
+
+
+async def probe_url(url: URLstr, /) -> bool:
+    async def _head() -> bool:
+        async with get_http_session().head(url, allow_redirects=True) as resp:
+            return resp.status == 200
+
+    try:
+        return await _retrying(_head)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return False
+
+
+async def fetch_range(url: URLstr, start: int, length: int, /) -> Option[bytes]:
+    """Fetches `length` bytes of `url` from `start`, returning `None` if the server cannot serve that range"""
+
+    async def _get() -> Option[bytes]:
+        headers = {'Range': f'bytes={start}-{start + length - 1}'}
+        async with get_http_session().get(url, headers=headers) as resp:
+            resp.raise_for_status()
+            # A server ignoring the range still sends the file from its beginning
+            if resp.status != 206 and start:
+                return None
+            buf = bytearray()
+            while len(buf) < length and (
+                chunk := await resp.content.read(length - len(buf))
+            ):
+                buf += chunk
+            return bytes(buf)
+
+    return await _retrying(_get)
@@ -1,34 +1,66 @@
 import io
 import typing as t
 import asyncio
-import tempfile
-import urllib.error as urllib_er
-import urllib.request as urllib_rq
+import logging
+import multiprocessing as mp
+import concurrent.futures as cf
+import concurrent.futures.process as cfp
 
 # pyright: reportMissingTypeStubs=false
-import numpy as np
-import scipy.cluster as sp_cls
-import sklearn.cluster as sk_cls
-import mutagen
-import mutagen.flac as mutagen_flac
-import memoization as mz
-import sclib as sc
+import aiohttp
+import img_tasks
 import lavasnek_rs as lv
 
-from PIL import Image as pil_img
-
+if t.TYPE_CHECKING:
+    import mutagen
+    import mutagen.id3 as mutagen_id3
+    import mutagen.flac as mutagen_flac
+    import sclib as sc
+
+    from PIL import Image as pil_img
+
+from .consts import (
+    ALBUM_ART_CACHE_BYTES,
+    ALBUM_ART_PROBE_BYTES,
+    DECODED_IMG_CACHE_BYTES,
+    IMG_CACHE_BYTES,
+    IMG_PENDING_LIM,
+    IMG_WORKERS,
+    LYRICS_CACHE_SIZE,
+    LYRICS_CACHE_TTL,
+    LYRICS_PROVIDER_TIMEOUT,
+    PALETTE_CACHE_SIZE,
+    THUMBNAIL_CACHE_SIZE,
+)
+from ._extras_http import fetch_bytes, fetch_range, probe_url
 from ._extras_types import Option, OptionResult, URLstr, RGBTriplet
+from ._extras_caches import TTLCache, acached, cached, digest_key
 from ._extras_vars import (
-    ytm_api,
-    gn_api,
-    sc_api,
+    get_ytm_api,
+    get_gn_api,
+    get_sc_api,
+    lazy_import,
     genius_regex,
     genius_regex_2,
     youtube_regex,
     soundcloud_regex,
+    title_noise_regex,
 )
 
 
+_T = t.TypeVar('_T')
+
+logger = logging.getLogger(__name__)
+
+## Heavy and only needed once a track's artwork or lyrics are first looked up
+if not t.TYPE_CHECKING:
+    mutagen = lazy_import('mutagen')
+    mutagen_id3 = lazy_import('mutagen.id3')
+    mutagen_flac = lazy_import('mutagen.flac')
+    sc = lazy_import('sclib')
+    pil_img = lazy_import('PIL.Image')
+
+
 class LyricsData(t.NamedTuple):
     source: str
     lyrics: str
@@ -41,7 +73,8 @@ class LyricsData(t.NamedTuple):
 
 
 # pyright: reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false
-async def get_lyrics_yt(song: str, /) -> Option[LyricsData]:
+def get_lyrics_yt(song: str, /) -> Option[LyricsData]:
+    ytm_api = get_ytm_api()
     queried = ytm_api.search(song, 'songs') + ytm_api.search(song, 'videos')
     if not queried:
         return None
@@ -65,7 +98,8 @@ async def get_lyrics_yt(song: str, /) -> Option[LyricsData]:
     )
 
 
-async def get_lyrics_ge(song: str, /) -> Option[LyricsData]:
+def get_lyrics_ge(song: str, /) -> Option[LyricsData]:
+    gn_api = get_gn_api()
     song_0 = gn_api.search_song(song, get_full_info=False)
     if not song_0:
         return None
@@ -90,110 +124,304 @@ async def get_lyrics_ge(song: str, /) -> Option[LyricsData]:
     )
 
 
-async def get_lyrics(song: str, /) -> dict[str, LyricsData]:
-    from .errors import LyricsNotFound
+LyricsProvider = t.Callable[[str], Option[LyricsData]]
 
-    # tests = (get_lyrics_ge(song), get_lyrics_yt(song))
-    tests = (get_lyrics_yt(song),)
-    if not any(lyrics := await asyncio.gather(*tests)):
-        raise LyricsNotFound
-    return {l.source: l for l in lyrics if l}
+lyrics_providers: list[LyricsProvider] = [get_lyrics_yt, get_lyrics_ge]
+lyrics_cache: TTLCache[str, tuple[LyricsData, ...]] = TTLCache(
+    LYRICS_CACHE_SIZE, LYRICS_CACHE_TTL
+)
 
 
-@mz.cached
-def get_url_audio_album_art(url: URLstr, /) -> Option[bytes]:
-    req = urllib_rq.Request(url, headers={'User-Agent': "Magic Browser"})
-    with urllib_rq.urlopen(req) as f:
-        with tempfile.NamedTemporaryFile() as tmp:
-            tmp.write(f.read())
-            file = mutagen.File(tmp.name)
-        if isinstance(file, mutagen_flac.FLAC):
-            if not file.pictures:
-                return None
-            return file.pictures[0].data
-        tags = file.tags
-        if not tags:
+def _normalize_title(song: str, /) -> str:
+    return ' '.join(title_noise_regex.sub(' ', song.casefold()).split())
+
+
+async def _run_lyrics_provider(
+    provider: LyricsProvider, song: str, /
+) -> tuple[bool, Option[LyricsData]]:
+    """Returns whether `provider` answered in time without failing, along with the lyrics it found if any"""
+    ## The providers' clients are blocking, so each one gets a thread and a deadline of its own
+    try:
+        return True, await asyncio.wait_for(
+            asyncio.to_thread(provider, song), LYRICS_PROVIDER_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Lyrics provider '{provider.__name__}' timed out for '{song}'")
+    except Exception as exc:
+        logger.warning(
+            f"Lyrics provider '{provider.__name__}' failed for '{song}': {exc!r}"
+        )
+    return False, None
+
+
+async def iter_lyrics(song: str, /) -> t.AsyncIterator[LyricsData]:
+    """Yields the lyrics of `song` from every provider in parallel as they arrive, caching them only if every provider has answered"""
+    key = _normalize_title(song)
+    if (hit := lyrics_cache.get(key)) is not None:
+        for ly in hit:
+            yield ly
+        return
+
+    tasks = [
+        asyncio.create_task(_run_lyrics_provider(p, song)) for p in lyrics_providers
+    ]
+    found: list[LyricsData] = []
+    answered = True
+    try:
+        for fut in asyncio.as_completed(tasks):
+            ok, ly = await fut
+            answered &= ok
+            if ly:
+                found.append(ly)
+                yield ly
+    finally:
+        for task in tasks:
+            task.cancel()
+    ## A provider timing out or failing may well have the lyrics next time
+    if found and answered:
+        lyrics_cache.set(key, (*found,))
+
+
+def _read_album_art(audio: bytes, /) -> Option[bytes]:
+    file = mutagen.File(io.BytesIO(audio))
+    if isinstance(file, mutagen_flac.FLAC):
+        if not file.pictures:
             return None
-        if (p := tags.get('APIC:')) or (p := tags.get('APIC:cover')):
-            return p.data
+        return file.pictures[0].data
+    tags = file and file.tags
+    if not tags:
+        return None
+    if (p := tags.get('APIC:')) or (p := tags.get('APIC:cover')):
+        return p.data
+    if covr := tags.get('covr'):
+        return bytes(covr[0])
+    return None
+
+
+class _RangeUnsupported(Exception):
+    pass
+
+
+def _read_id3_art(tag: bytes, /) -> Option[bytes]:
+    if pics := mutagen_id3.ID3(io.BytesIO(tag)).getall('APIC'):
+        return pics[0].data
+    return None
+
+
+def _mp4_boxes(buf: bytes, start: int, end: int, /):
+    pos = start
+    while pos + 8 <= end:
+        size, hdr = int.from_bytes(buf[pos : pos + 4], 'big'), 8
+        if size == 1:
+            size, hdr = int.from_bytes(buf[pos + 8 : pos + 16], 'big'), 16
+        elif size == 0:
+            size = end - pos
+        if size < hdr:
+            return
+        yield buf[pos + 4 : pos + 8], pos + hdr, min(pos + size, end)
+        pos += size
+
+
+def _read_mp4_art(moov: bytes, /) -> Option[bytes]:
+    ## moov > udta > meta (a full box, so 4 more bytes) > ilst > covr > data
+    path = (b'moov', b'udta', b'meta', b'ilst', b'covr', b'data')
+    start, end = 0, len(moov)
+    for box in path:
+        found = next((b for b in _mp4_boxes(moov, start, end) if b[0] == box), None)
+        if not found:
+            return None
+        _, start, end = found
+        if box == b'meta':
+            start += 4
+    ## the data box starts with a 4 bytes type indicator and a 4 bytes locale
+    return moov[start + 8 : end] or None
+
+
+async def _fetch_range(url: URLstr, start: int, length: int, /) -> bytes:
+    try:
+        data = await fetch_range(url, start, length)
+    except aiohttp.ClientResponseError as e:
+        ## e.g. a 416 for a range past the end of a truncated or mislabeled file
+        raise _RangeUnsupported from e
+    if data is None:
+        raise _RangeUnsupported
+    return data
+
+
+async def _read_album_art_ranged(url: URLstr, /) -> Option[bytes]:
+    head = await _fetch_range(url, 0, ALBUM_ART_PROBE_BYTES)
+
+    async def read_at(start: int, length: int, /) -> bytes:
+        if start + length <= len(head):
+            return head[start : start + length]
+        data = await _fetch_range(url, start, length)
+        if len(data) < length:
+            raise _RangeUnsupported
+        return data
+
+    if head[:3] == b'ID3':
+        ## the tag's size is a 28 bits syncsafe integer, plus the header and an optional footer
+        size = 0
+        for b in head[6:10]:
+            size = (size << 7) | (b & 0x7F)
+        size += 20 if head[5] & 0x10 else 10
+        return await asyncio.to_thread(_read_id3_art, await read_at(0, size))
+
+    if head[:4] == b'fLaC':
+        pos = 4
+        while True:
+            block = await read_at(pos, 4)
+            kind, length = block[0] & 0x7F, int.from_bytes(block[1:4], 'big')
+            if kind == 6:
+                return mutagen_flac.Picture(await read_at(pos + 4, length)).data
+            if block[0] & 0x80:
+                return None
+            pos += 4 + length
+
+    if head[4:8] == b'ftyp':
+        pos = 0
+        while True:
+            box = await read_at(pos, 16)
+            size = int.from_bytes(box[:4], 'big')
+            if size == 1:
+                size = int.from_bytes(box[8:16], 'big')
+            if size < 8:
+                return None
+            if box[4:8] == b'moov':
+                return _read_mp4_art(await read_at(pos, size))
+            pos += size
+
+    raise _RangeUnsupported
 
 
-@mz.cached
-def url_to_bytesio(img_url: URLstr, /) -> io.BytesIO:
-    return io.BytesIO(urllib_rq.urlopen(img_url).read())
+@acached(max_bytes=ALBUM_ART_CACHE_BYTES)
+async def get_url_audio_album_art(url: URLstr, /) -> Option[bytes]:
+    try:
+        return await _read_album_art_ranged(url)
+    except (_RangeUnsupported, ValueError, mutagen.MutagenError):
+        ## unknown containers or servers without range support
+        audio = await fetch_bytes(url)
+        return await asyncio.to_thread(_read_album_art, audio)
 
 
-@mz.cached
-def url_to_img(img_url: URLstr, /) -> pil_img.Image:
-    return pil_img.open(url_to_bytesio(img_url))
+@acached(max_bytes=IMG_CACHE_BYTES)
+async def url_to_bytes(img_url: URLstr, /) -> bytes:
+    return await fetch_bytes(img_url)
 
 
-@mz.cached
-def img_to_bytes(img: pil_img.Image, /, format: Option[str] = None) -> bytes:
+def img_to_bytes(img: 'pil_img.Image', /, format: Option[str] = None) -> bytes:
     img.save(b := io.BytesIO(), format)
     return b.getvalue()
 
 
-@mz.cached
-def bytes_to_img(img_b: bytes, /) -> pil_img.Image:
+@cached(max_bytes=DECODED_IMG_CACHE_BYTES, key=digest_key)
+def bytes_to_img(img_b: bytes, /) -> 'pil_img.Image':
     return pil_img.open(io.BytesIO(img_b))
 
 
-@mz.cached
-def limit_bytes_img_size(img_b: bytes, /, limit_size: int = 8 * 2**20) -> bytes:
+_img_executor: Option[cf.ProcessPoolExecutor] = None
+_img_sema: t.Final = asyncio.Semaphore(IMG_PENDING_LIM)
+
+
+def _get_img_executor() -> cf.ProcessPoolExecutor:
+    global _img_executor
+    if _img_executor is None:
+        ## Forking this process would copy the state of its database and executor threads
+        if 'forkserver' in mp.get_all_start_methods():
+            mp_ctx = mp.get_context('forkserver')
+            mp_ctx.set_forkserver_preload([img_tasks.__name__])
+        else:
+            mp_ctx = mp.get_context('spawn')
+        _img_executor = cf.ProcessPoolExecutor(IMG_WORKERS, mp_context=mp_ctx)
+    return _img_executor
+
+
+def _drop_img_executor(executor: cf.ProcessPoolExecutor, /) -> None:
+    global _img_executor
+    if _img_executor is executor:
+        _img_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_img_task(func: t.Callable[..., _T], /, *args: t.Any) -> _T:
+    """Runs CPU-heavy image work in the image process pool, waiting while too many jobs are already pending
+
+    A pool broken by a dying worker is replaced, and the work is retried on the new one once
+    """
+    async with _img_sema:
+        for retry in (True, False):
+            executor = _get_img_executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    executor, func, *args
+                )
+            except cfp.BrokenProcessPool:
+                _drop_img_executor(executor)
+                if not retry:
+                    raise
+                logger.warning("An image worker died, restarting the image workers")
+        raise RuntimeError("Unreachable")
+
+
+@acached(max_bytes=IMG_CACHE_BYTES, key=digest_key)
+async def _shrink_img_cached(img_b: bytes, limit_size: int, /) -> bytes:
+    return await run_img_task(img_tasks.shrink_img, img_b, limit_size)
+
+
+async def limit_bytes_img_size(img_b: bytes, /, limit_size: int = 8 * 2**20) -> bytes:
     if len(img_b) >= limit_size:
-        resize = np.sqrt(len(img_b) / limit_size)
-        img = bytes_to_img(img_b)
-        return img_to_bytes(
-            img.resize((*(int(d / resize) for d in img.size),)), img.format
-        )
+        return await _shrink_img_cached(img_b, limit_size)
     return img_b
 
 
-@mz.cached
-def get_img_pallete(
-    img_url_b: URLstr | bytes, /, *, n: int = 5, resize: tuple[int, int] = (150, 150)
+@acached(PALETTE_CACHE_SIZE, key=digest_key)
+async def get_img_pallete(
+    img_b: bytes,
+    /,
+    *,
+    n: int = 5,
+    resize: tuple[int, int] = (150, 150),
+    bits: int = 3,
+    min_dist: float = 48.0,
 ) -> tuple[RGBTriplet, ...]:
-    if isinstance(img_url_b, URLstr):
-        img = url_to_img(img_url_b)
-    else:
-        img = bytes_to_img(img_url_b)
-    ## optional, to reduce time
-    ar = np.asarray(img.resize(resize))
-    shape = ar.shape
-    ar = ar.reshape(np.product(shape[:2]), shape[2]).astype(float)
-
-    kmeans = sk_cls.MiniBatchKMeans(
-        n_clusters=n, init="k-means++", max_iter=20, random_state=1000
-    ).fit(ar)
-    codes = kmeans.cluster_centers_
-
-    ## assign codes
-    vecs, _dist = sp_cls.vq.vq(ar, codes)
-    ## count occurrences
-    counts, _bins = np.histogram(vecs, len(codes))
-
-    return (
-        *((*(int(code) for code in codes[i]),) for i in np.argsort(counts)[::-1]),
-    )  ## returns colors in order of dominance
-
-
-@mz.cached
-def get_thumbnail(t_info: lv.Info, /) -> OptionResult[URLstr | bytes]:
+    return await run_img_task(
+        img_tasks.compute_img_palette, img_b, n, resize, bits, min_dist
+    )
+
+
+## Only the URLs are cached here, as album art is already kept within a byte budget of its own
+@acached(THUMBNAIL_CACHE_SIZE, key=lambda t_info: t_info.identifier)
+async def _get_thumbnail_url(t_info: lv.Info, /) -> Option[URLstr]:
     uri = t_info.uri
     id_ = t_info.identifier
 
     if youtube_regex.fullmatch(uri):
-        for x in ('maxresdefault', 'sddefault', 'mqdefault', 'hqdefault', 'default'):
-            url = f'https://img.youtube.com/vi/{id_}/{x}.jpg'
-            try:
-                if (urllib_rq.urlopen(url)).getcode() == 200:
-                    return url
-            except urllib_er.HTTPError:
-                continue
+        urls = (
+            *(
+                f'https://img.youtube.com/vi/{id_}/{x}.jpg'
+                for x in (
+                    'maxresdefault',
+                    'sddefault',
+                    'mqdefault',
+                    'hqdefault',
+                    'default',
+                )
+            ),
+        )
+        probes = await asyncio.gather(*(probe_url(url) for url in urls))
+        for url, ok in zip(urls, probes):
+            if ok:
+                return url
         raise ValueError('Malformed youtube thumbnail uri')
     if soundcloud_regex.fullmatch(uri):
-        track = sc_api.resolve(uri)
+        track = await asyncio.to_thread(get_sc_api().resolve, uri)
         assert isinstance(track, sc.Track)
         return track.artwork_url
-    return get_url_audio_album_art(uri)
+    raise NotImplementedError
+
+
+async def get_thumbnail(t_info: lv.Info, /) -> OptionResult[URLstr | bytes]:
+    uri = t_info.uri
+    if youtube_regex.fullmatch(uri) or soundcloud_regex.fullmatch(uri):
+        return await _get_thumbnail_url(t_info)
+    return await get_url_audio_album_art(uri)
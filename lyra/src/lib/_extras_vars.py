@@ -1,21 +1,59 @@
 import os
 import re
+import sys
+import types
 import typing as t
 import asyncio
+import functools as ft
+import importlib
 
-# pyright: reportMissingTypeStubs=false
-import sclib as sc
-import lyricsgenius as lg
+if t.TYPE_CHECKING:
+    import sclib as sc
+    import lyricsgenius as lg
 
-from ytmusicapi import YTMusic
+    from ytmusicapi import YTMusic
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, name: str) -> t.Any:
+        mod = importlib.import_module(self.__name__)
+        self.__dict__.update(mod.__dict__)
+        return getattr(mod, name)
+
+
+def lazy_import(name: str, /) -> types.ModuleType:
+    """Returns module `name`, deferring its actual import until one of its attributes is first accessed"""
+    return sys.modules.get(name) or _LazyModule(name)
+
+
+@ft.cache
+def get_ytm_api() -> 'YTMusic':
+    from ytmusicapi import YTMusic
+
+    return YTMusic()
+
+
+@ft.cache
+def get_sc_api() -> 'sc.SoundcloudAPI':
+    import sclib as sc
+
+    return sc.SoundcloudAPI()
+
+
+@ft.cache
+def get_gn_api() -> 'lg.Genius':
+    import lyricsgenius as lg
+
+    gn_api = lg.Genius(
+        os.environ['GENIUS_ACCESS_TOKEN'],
+        remove_section_headers=True,
+        retries=3,
+        timeout=8,
+    )
+    gn_api.verbose = False
+    return gn_api
 
 
-ytm_api: t.Final = YTMusic()
-sc_api: t.Final = sc.SoundcloudAPI()
-gn_api: t.Final = lg.Genius(
-    os.environ['GENIUS_ACCESS_TOKEN'], remove_section_headers=True, retries=3, timeout=8
-)
-gn_api.verbose = False
 loop = asyncio.get_event_loop()
 
 
@@ -40,6 +78,9 @@ url_regex: t.Final = re.compile(
     r'(?:/?|[/?]\S+)$',
     re.I,
 )
+title_noise_regex: t.Final = re.compile(
+    r"[\(\[][^\)\]]*[\)\]]|\b(?:official|lyrics?|audio|video|mv|hd|4k)\b|[^\w\s]"
+)
 genius_regex: t.Final = re.compile(r'\d*Embed')
 genius_regex_2: t.Final = re.compile(r'^.+ Lyrics\n')
 # LYRICS_URL = 'https://some-random-api.ml/lyrics?title='
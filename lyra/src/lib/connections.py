@@ -1,4 +1,3 @@
-import typing as t
 import logging
 
 import hikari as hk
@@ -14,6 +13,7 @@ from .utils import (
     ConnectionInfo,
     Contextish,
     err_say,
+    fetch_member_permissions,
     fetch_permissions,
     get_client,
     get_pref,
@@ -31,8 +31,9 @@ from .errors import (
     RequestedToSpeak,
     Restricted,
 )
-from .dataimpl import LyraDBCollectionType
-from .lavautils import access_data, access_queue
+from .dataimpl import GuildConfigCache
+from .lavapool import LavalinkPool
+from .lavautils import access_data, access_queue, release_data
 
 
 logger = logging.getLogger(lgfmt(__name__))
@@ -90,30 +91,18 @@ async def join(
     bot_m = ctx.cache.get_member(ctx.guild_id, bot_u)
     assert bot_m
 
-    my_perms = await tj.utilities.fetch_permissions(ctx.client, bot_m, channel=new_ch)
+    my_perms = await fetch_member_permissions(ctx.client, bot_m, channel=new_ch)
     if not (my_perms & (p := hkperms.CONNECT)):
         raise Forbidden(p, channel=new_ch)
 
-    cfg = ctx.client.get_type_dependency(LyraDBCollectionType)
+    cfg = ctx.client.get_type_dependency(GuildConfigCache)
     assert not isinstance(cfg, al.abc.Undefined)
 
-    g_cfg = cfg.find_one({'id': str(ctx.guild_id)})
-    assert g_cfg
+    res_ch = (await cfg.get_restrictions(ctx.guild_id)).channels
+    res_ch_all = res_ch.all
+    ch_wl = res_ch.wl_mode
 
-    res_ch = g_cfg.get('restricted_ch', {})
-    res_ch_all: set[int] = {
-        *(
-            map(
-                int,
-                res_ch.get('all', []),  # pyright: ignore [reportUnknownArgumentType]
-            )
-        )
-    }
-    ch_wl: t.Literal[-1, 0, 1] = res_ch.get('wl_mode', 0)
-
-    author_perms = await tj.utilities.fetch_permissions(
-        ctx.client, ctx.member, channel=ctx.channel_id
-    )
+    author_perms = await fetch_permissions(ctx)
 
     if (
         (ch_wl == 1 and new_ch not in res_ch_all)
@@ -121,14 +110,23 @@ async def join(
     ) and not (author_perms & (hkperms.ADMINISTRATOR | RESTRICTOR)):
         raise Restricted(ch_wl, obj=new_ch)
 
-    # Connect to the channel
-    await ctx.shards.update_voice_state(ctx.guild_id, new_ch, self_deaf=True)
+    if isinstance(lvc, LavalinkPool):
+        # The chosen node has to see the voice updates that connecting brings
+        lvc.place(ctx.guild_id)
+
+    try:
+        # Connect to the channel
+        await ctx.shards.update_voice_state(ctx.guild_id, new_ch, self_deaf=True)
 
-    # Lavasnek waits for the data on the event
-    sess_conn = await lvc.wait_for_full_connection_info_insert(ctx.guild_id)
+        # Lavasnek waits for the data on the event
+        sess_conn = await lvc.wait_for_full_connection_info_insert(ctx.guild_id)
 
-    # Lavasnek tells lavalink to connect
-    await lvc.create_session(sess_conn)
+        # Lavasnek tells lavalink to connect
+        await lvc.create_session(sess_conn)
+    except BaseException:
+        if isinstance(lvc, LavalinkPool) and not old_conn:
+            lvc.release(ctx.guild_id)
+        raise
 
     async with access_data(ctx, lvc) as d:
         d.out_channel_id = ctx.channel_id
@@ -189,7 +187,10 @@ async def cleanup(
             await shards.update_voice_state(guild, None)
         await lvc.wait_for_connection_info_remove(guild)
     await lvc.remove_guild_node(guild)
+    release_data(guild)
     await lvc.remove_guild_from_loops(guild)
+    if isinstance(lvc, LavalinkPool):
+        lvc.release(guild)
 
 
 async def join_impl_precaught(
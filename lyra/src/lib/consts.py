@@ -10,10 +10,68 @@ Q_CHUNK: t.Final = 15
 """Amount of tracks in the queue to be displayed per page in the `/queue` command"""
 RETRIES: t.Final = 3
 """Amount of tries to retry when some over-the-web operations failed"""
-STOP_REFRESH: t.Final = 0.15
-"""How many seconds to wait before checking the next time whether the track is confirmed to be stopped"""
+TRACK_EVENT_TIMEOUT: t.Final = 10
+"""How many seconds to wait for Lavalink to confirm that a track had been stopped or started before giving up"""
+PREFETCH_LEAD: t.Final = 15
+"""How many seconds before the current track ends to start preparing the next track's thumbnail, palette and now-playing embed"""
 ADD_TRACKS_WRAP_LIM: t.Final = 3
 """How many tracks to be displayed in `/play`'s output before the text got summarized to "Added <i> tracks...\""""
+ENQUEUE_CHUNK: t.Final = 50
+"""How many tracks of a large playlist to be enqueued up-front, the rest being appended in the background this many tracks at a time"""
+TRACK_LOADS_LIM: t.Final = 16
+"""How many track searches or loads can be sent to Lavalink at once across all guilds"""
+TRACK_LOADS_GUILD_LIM: t.Final = 4
+"""How many track searches or loads can be sent to Lavalink at once per guild"""
+TRACKS_CACHE_SIZE: t.Final = 1_024
+"""How many track search or load results to be kept in memory before the least recently used ones got evicted"""
+TRACKS_CACHE_TTL: t.Final = 1_800
+"""How many seconds a cached track search or load result stays valid before Lavalink is queried again"""
+TRACK_INFOS_CACHE_SIZE: t.Final = 8_192
+"""How many encoded tracks' decoded info to be kept in memory before the least recently used ones got evicted"""
+NODE_STATS_TIMEOUT: t.Final = 90
+"""How many seconds a Lavalink node may go without sending stats before its guilds are failed over to another node"""
+HTTP_TIMEOUT: t.Final = 10
+"""How many seconds an outgoing HTTP request for thumbnails or artworks may take before being retried"""
+HTTP_CONN_LIMIT: t.Final = 32
+"""How many pooled HTTP connections can be open at once for thumbnails and artworks"""
+THUMBNAIL_CACHE_SIZE: t.Final = 1_024
+"""How many tracks' resolved thumbnails to be kept in memory before the least recently used ones got evicted"""
+IMG_CACHE_BYTES: t.Final = 64 * 2**20
+"""How many bytes of downloaded or resized images to be kept in memory, per cache, before the least recently used ones got evicted"""
+DECODED_IMG_CACHE_BYTES: t.Final = 64 * 2**20
+"""How many bytes of decoded image pixels to be kept in memory before the least recently used images got evicted"""
+ALBUM_ART_CACHE_BYTES: t.Final = 32 * 2**20
+"""How many bytes of album artworks read from audio files to be kept in memory before the least recently used ones got evicted"""
+PALETTE_CACHE_SIZE: t.Final = 4_096
+"""How many images' computed palettes to be kept in memory before the least recently used ones got evicted"""
+ART_CACHE_PATH: t.Final = './cache/art.sqlite3'
+"""Where the tracks' thumbnail URLs and palettes are persisted across restarts"""
+ART_CACHE_ROWS: t.Final = 50_000
+"""How many persisted thumbnail URLs and palettes to be kept on disk before the least recently used ones got evicted"""
+ALBUM_ART_PROBE_BYTES: t.Final = 16 * 2**10
+"""How many bytes from the start of an audio file to fetch first when looking for its album art"""
+IMG_WORKERS: t.Final = 2
+"""How many processes the image resizing and palette extraction can be run on concurrently"""
+IMG_PENDING_LIM: t.Final = 8
+"""How many image jobs can be submitted to the image processes at once before new ones have to wait"""
+NOWPLAYING_EDIT_DEBOUNCE: t.Final = 1.5
+"""How many seconds to wait for further track changes before editing the now-playing message in place"""
+LYRICS_PROVIDER_TIMEOUT: t.Final = 10
+"""How many seconds a lyrics provider has to answer before its result is given up on"""
+LYRICS_CACHE_SIZE: t.Final = 512
+"""How many songs' lyrics can be cached before the least recently used ones are evicted"""
+LYRICS_CACHE_TTL: t.Final = 86_400
+"""How many seconds a song's cached lyrics are kept before they are looked up again"""
+DB_WORKERS: t.Final = 8
+"""How many threads the database calls can be run on concurrently"""
+GUILD_CFG_CACHE_SIZE: t.Final = 1_024
+"""How many guild configs to be kept in memory before the least recently used ones got evicted"""
+GUILD_CFG_CACHE_TTL: t.Final = 600
+"""How many seconds a cached guild config stays valid before being re-fetched from the database"""
+PERMS_CACHE_SIZE: t.Final = 256
+"""How many resolved member permissions to be kept in memory per guild before the least recently used ones got evicted"""
+PERMS_CACHE_TTL: t.Final = 15
+"""How many seconds a member's resolved channel permissions stay cached, unless a role, member or channel update invalidated it sooner"""
 
 genius_icon: t.Final = (
     'https://images.genius.com/2f65c7544798653b46b7a1f132ce8768.512x512x1.png'
@@ -1,13 +1,20 @@
 import os
 import typing as t
+import asyncio
 import logging
+import functools as ft
+import concurrent.futures as cf
 
+import attr as a
+import hikari as hk
+import pymongo as mg
 import pymongo.collection as mg_co
 import pymongo.mongo_client as mg_cl
 
-import src.lib.globs as globs
+from . import globs
 
-from .extras import lgfmt
+from .consts import DB_WORKERS, GUILD_CFG_CACHE_SIZE, GUILD_CFG_CACHE_TTL
+from .extras import Option, TTLCache, lgfmt
 
 # import firebase_admin as fb
 
@@ -51,6 +58,170 @@ LyraDBClientType = mg_cl.MongoClient[LyraDBDocumentType]
 LyraDBCollectionType = mg_co.Collection[LyraDBDocumentType]
 
 _client: LyraDBClientType = mg_cl.MongoClient(conn_str % pwd)
+_executor = cf.ThreadPoolExecutor(DB_WORKERS, thread_name_prefix='lyra-db')
+
+_P = t.ParamSpec('_P')
+_T = t.TypeVar('_T')
+
+
+async def run_in_db_executor(
+    func: t.Callable[_P, _T], /, *args: _P.args, **kwargs: _P.kwargs
+) -> _T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, ft.partial(func, *args, **kwargs))
+
+
+@a.define
+class AsyncCollection:
+    """Runs the blocking `pymongo` collection calls on a bounded thread pool so they won't stall the event loop"""
+
+    collection: LyraDBCollectionType
+
+    # pyright: reportUnknownMemberType=false
+    async def find(
+        self, flt: Option[LyraDBDocumentType] = None, /
+    ) -> list[LyraDBDocumentType]:
+        return await run_in_db_executor(lambda: [*self.collection.find(flt)])
+
+    async def find_one(self, flt: LyraDBDocumentType, /) -> Option[LyraDBDocumentType]:
+        return await run_in_db_executor(self.collection.find_one, flt)
+
+    async def insert_one(self, doc: LyraDBDocumentType, /) -> None:
+        await run_in_db_executor(self.collection.insert_one, doc)
+
+    async def update_one(
+        self,
+        flt: LyraDBDocumentType,
+        update: LyraDBDocumentType | list[LyraDBDocumentType],
+        /,
+        *,
+        upsert: bool = False,
+    ) -> None:
+        await run_in_db_executor(self.collection.update_one, flt, update, upsert=upsert)
+
+    async def find_one_and_replace(
+        self, flt: LyraDBDocumentType, doc: LyraDBDocumentType, /
+    ) -> Option[LyraDBDocumentType]:
+        return await run_in_db_executor(self.collection.find_one_and_replace, flt, doc)
+
+    async def find_one_and_upsert(
+        self,
+        flt: LyraDBDocumentType,
+        update: LyraDBDocumentType | list[LyraDBDocumentType],
+        /,
+    ) -> LyraDBDocumentType:
+        return await run_in_db_executor(
+            self.collection.find_one_and_update,
+            flt,
+            update,
+            upsert=True,
+            return_document=mg.ReturnDocument.AFTER,
+        )
+
+
+@a.frozen
+class Restrictions:
+    wl_mode: t.Literal[-1, 0, 1] = 0
+    all: frozenset[int] = frozenset()
+
+    @classmethod
+    def from_dict(cls, res: LyraDBDocumentType, /):
+        return cls(res.get('wl_mode', 0), frozenset(map(int, res.get('all', []))))
+
+
+@a.frozen
+class GuildRestrictions:
+    """The compiled restricted channels, roles and members of a guild"""
+
+    channels: Restrictions = Restrictions()
+    roles: Restrictions = Restrictions()
+    users: Restrictions = Restrictions()
+
+    @property
+    def is_active(self) -> bool:
+        return bool(self.channels.wl_mode or self.roles.wl_mode or self.users.wl_mode)
+
+    @classmethod
+    def from_cfg(cls, g_cfg: LyraDBDocumentType, /):
+        return cls(
+            *(
+                Restrictions.from_dict(g_cfg.get('restricted_%s' % cat, {}))
+                for cat in ('ch', 'r', 'u')
+            )
+        )
+
+
+@a.define
+class GuildConfigCache:
+    """A write-through cache in front of the `prefs.guilds` collection"""
+
+    collection: AsyncCollection
+    _cache: TTLCache[str, LyraDBDocumentType] = a.field(
+        factory=lambda: TTLCache(GUILD_CFG_CACHE_SIZE, GUILD_CFG_CACHE_TTL),
+        init=False,
+    )
+    _restrictions: TTLCache[str, GuildRestrictions] = a.field(
+        factory=lambda: TTLCache(GUILD_CFG_CACHE_SIZE), init=False
+    )
+
+    async def get(self, guild: hk.Snowflakeish, /) -> LyraDBDocumentType:
+        g_id = str(guild)
+        if (g_cfg := self._cache.get(g_id)) is not None:
+            return g_cfg
+
+        return await self.update(guild, {'$setOnInsert': {'prefixes': []}})
+
+    async def update(
+        self,
+        guild: hk.Snowflakeish,
+        update: LyraDBDocumentType | list[LyraDBDocumentType],
+        /,
+    ) -> LyraDBDocumentType:
+        g_id = str(guild)
+        g_cfg = await self.collection.find_one_and_upsert({'id': g_id}, update)
+        self._cache.set(g_id, g_cfg)
+        self._restrictions.pop(g_id)
+        return g_cfg
+
+    async def get_restrictions(self, guild: hk.Snowflakeish, /) -> GuildRestrictions:
+        g_id = str(guild)
+        if (res := self._restrictions.get(g_id)) is not None:
+            return res
+
+        res = GuildRestrictions.from_cfg(await self.get(guild))
+        self._restrictions.set(g_id, res)
+        return res
+
+    def invalidate(self, guild: hk.Snowflakeish, /) -> None:
+        self._cache.pop(g_id := str(guild))
+        self._restrictions.pop(g_id)
+
+
+@a.define
+class UnplayableTracks:
+    """An in-memory index of the identifiers in the `internal.unplayable-tracks` collection"""
+
+    collection: AsyncCollection
+    _identifiers: set[str] = a.field(factory=set, init=False)
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self._identifiers
+
+    def __len__(self) -> int:
+        return len(self._identifiers)
+
+    async def load(self) -> None:
+        self._identifiers = {upt['identifier'] for upt in await self.collection.find()}
+        logger.info(f"Loaded {len(self)} unplayable tracks")
+
+    async def add(self, identifier: str, /) -> None:
+        if identifier in self._identifiers:
+            return
+
+        flt = {'identifier': identifier}
+        await self.collection.update_one(flt, {'$setOnInsert': flt}, upsert=True)
+        ## Only once it is stored, so a failed write is retried the next time the track fails
+        self._identifiers.add(identifier)
 
 
 def init_mongo_client():
@@ -19,13 +19,24 @@ from ._extras_types import (
     MaybeIterable,
     URLstr,
 )
+from ._extras_caches import (
+    CacheStats,
+    SingleflightCache,
+    SizedLRUCache,
+    SQLiteCache,
+    TTLCache,
+    acached,
+    cached,
+)
+from ._extras_http import close_http_session, fetch_bytes, get_http_session
 from ._extras_vars import time_regex, time_regex_2, url_regex, loop
 from ._extras_untyped import (
     limit_bytes_img_size,
     get_img_pallete,
     get_thumbnail,
-    get_lyrics,
-    url_to_bytesio,
+    iter_lyrics,
+    LyricsData,
+    url_to_bytes,
 )
 from .consts import LOG_PAD
 
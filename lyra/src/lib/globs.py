@@ -1,8 +1,10 @@
 import sys
+import typing as t
 
 import tanjun as tj
 
-from src.lib.dataimpl import LyraDBClientType
+if t.TYPE_CHECKING:
+    from .dataimpl import LyraDBClientType
 
 
 # pyright: reportGeneralTypeIssues=false
@@ -18,7 +20,7 @@ def init_client(client: tj.Client):
     raise RuntimeError(f"Client already initialized: {this.client}")
 
 
-def init_mongo_client(client: LyraDBClientType):
+def init_mongo_client(client: 'LyraDBClientType'):
     if this.mongo_client is None:
         this.mongo_client = client
         return client
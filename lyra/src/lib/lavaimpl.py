@@ -1,42 +1,182 @@
+import typing as t
 import asyncio
 import logging
+import contextlib as ctxlib
 
 import hikari as hk
+import tanjun as tj
 import alluka as al
 import lavasnek_rs as lv
 
-from .extras import lgfmt
-from .utils import EmojiRefs, get_client
+from .consts import NOWPLAYING_EDIT_DEBOUNCE
+from .extras import Option, lgfmt
+from .utils import EmojiRefs, ButtonBuilderType, edit_components, get_client
 from .playback import while_stop
-from .errors import QueueEmpty
+from .errors import NotConnected, QueueEmpty
 from .lavautils import (
     BaseEventHandler,
+    NodeData,
+    QueueList,
     RepeatMode,
     access_data,
+    decode_track,
     generate_nowplaying_embed,
     get_data,
     get_repeat_emoji,
+    repeat_emojis,
+    schedule_prefetch,
     wait_until_current_track_valid,
 )
-from .dataimpl import LyraDBClientType, LyraDBCollectionType
+from .lavapool import PoolNode
+from .dataimpl import GuildConfigCache, UnplayableTracks
 
 
 logger = logging.getLogger(lgfmt(__name__))
 logger.setLevel(logging.DEBUG)
 
 
+def build_controls(
+    rest: hk.api.RESTClient, erf: EmojiRefs, q: QueueList, /
+) -> tuple[hk.api.ActionRowBuilder]:
+    controls = rest.build_action_row()
+    (
+        controls.add_button(hk.ButtonStyle.SECONDARY, 'lyra_shuffle')
+        .set_emoji(erf['shuffle_b'])
+        .add_to_container()
+    )
+    (
+        controls.add_button(hk.ButtonStyle.SECONDARY, 'lyra_previous')
+        .set_emoji(erf['previous_b'])
+        .add_to_container()
+    )
+    (
+        controls.add_button(hk.ButtonStyle.PRIMARY, 'lyra_playpause')
+        .set_emoji(erf['resume_b'])
+        .add_to_container()
+    )
+    (
+        controls.add_button(hk.ButtonStyle.SECONDARY, 'lyra_skip')
+        .set_emoji(erf['skip_b'])
+        .add_to_container()
+    )
+    (
+        controls.add_button(hk.ButtonStyle.SUCCESS, 'lyra_repeat')
+        .set_emoji(get_repeat_emoji(q))
+        .add_to_container()
+    )
+    return (controls,)
+
+
+def sync_controls(rest: hk.api.RESTClient, erf: EmojiRefs, d: NodeData, /) -> None:
+    """Brings the cached controls' play/pause and repeat buttons back in line with the queue, as they may have changed while no message showed them"""
+    assert d.nowplaying_components
+    q = d.queue
+    edits: t.Callable[[ButtonBuilderType], ButtonBuilderType] = lambda x: x.set_emoji(
+        erf['pause_b' if q.is_paused else 'resume_b']
+    )
+    predicates: t.Callable[[ButtonBuilderType], bool] = lambda x: x.emoji in {
+        erf['pause_b'],
+        erf['resume_b'],
+    }
+    edit_components(
+        rest, *d.nowplaying_components, edits=edits, predicates=predicates
+    )
+    edit_components(
+        rest,
+        *d.nowplaying_components,
+        edits=lambda x: x.set_emoji(get_repeat_emoji(q)),
+        predicates=lambda x: x.emoji in repeat_emojis,
+    )
+
+
+def schedule_nowplaying_edit(
+    guild: hk.Snowflakeish, lvc: lv.Lavalink, data: NodeData, /
+) -> None:
+    # A pending edit always shows the latest track, so rapid skips fold into it
+    if data.nowplaying_task and not data.nowplaying_task.done():
+        return
+    data.nowplaying_task = asyncio.create_task(
+        _edit_nowplaying_msg(guild, lvc, data)
+    )
+
+
+async def _edit_nowplaying_msg(
+    guild: hk.Snowflakeish, lvc: lv.Lavalink, data: NodeData, /
+) -> None:
+    client = get_client()
+    assert client.cache
+    shown: Option[lv.TrackQueue] = None
+    while True:
+        await asyncio.sleep(NOWPLAYING_EDIT_DEBOUNCE)
+        q = data.queue
+        try:
+            if q.is_stopped or not (curr_t := q.current) or curr_t is shown:
+                return
+        except QueueEmpty:
+            return
+        if not (ch := data.out_channel_id):
+            return
+        shown = curr_t
+
+        try:
+            await _show_nowplaying_msg(guild, client, lvc, data, ch)
+        except (AssertionError, QueueEmpty, NotConnected):
+            # The queue or its requester changed under the edit, the next track start retries
+            return
+        except Exception as exc:
+            logger.warning(
+                f"In guild {guild} could not update the now playing message: {exc!r}"
+            )
+            return
+
+
+async def _show_nowplaying_msg(
+    guild: hk.Snowflakeish,
+    client: tj.abc.Client,
+    lvc: lv.Lavalink,
+    data: NodeData,
+    ch: hk.Snowflakeish,
+    /,
+) -> None:
+    assert client.cache
+    embed = await generate_nowplaying_embed(guild, client.cache, lvc)
+    components = data.nowplaying_components or ()
+    if (msg := data.nowplaying_msg) and msg.channel_id == ch:
+        try:
+            data.nowplaying_msg = await client.rest.edit_message(
+                ch, msg, embed=embed, components=components
+            )
+            return
+        except hk.NotFoundError:
+            pass
+    elif msg:
+        with ctxlib.suppress(hk.NotFoundError):
+            await client.rest.delete_messages(msg.channel_id, msg)
+    data.nowplaying_msg = await client.rest.create_message(
+        ch, embed=embed, components=components
+    )
+
+
 class EventHandler(BaseEventHandler):
-    def __new__(cls):
+    def __new__(cls, *args: t.Any, **kwargs: t.Any):
         logger.info("Connected to Lavalink Server")
         return super().__new__(cls)
 
+    def __init__(self, node: Option[PoolNode] = None, /) -> None:
+        # lavasnek hands every event a fresh `lv.Lavalink`, so the node can only be known up front
+        self.node = node
+
+    async def stats(self, lvc: lv.Lavalink, event: lv.Stats, /) -> None:
+        if self.node:
+            self.node.update(event)
+
     async def track_start(
         self,
         lvc: lv.Lavalink,
         event: lv.TrackStart,
         /,
     ) -> None:
-        t = (await lvc.decode_track(event.track)).title
+        t = (await decode_track(lvc, event.track)).title
 
         if not await lvc.get_guild_node(event.guild_id):
             return
@@ -46,19 +186,21 @@ class EventHandler(BaseEventHandler):
             if q.is_stopped:
                 return
             q.update_curr_t_started()
+            d.track_started.set()
             logger.debug(
                 f"In guild {event.guild_id} track [{q.pos: >3}/{l: >3}] started: '{t}'"
             )
 
             client = get_client()
+            assert client.cache
+            schedule_prefetch(event.guild_id, client.cache, lvc, d)
 
-            cfg = client.get_type_dependency(LyraDBCollectionType)
+            cfg = client.get_type_dependency(GuildConfigCache)
             erf = client.get_type_dependency(EmojiRefs)
 
             assert not isinstance(cfg, al.abc.Undefined) and erf
 
-            g_cfg = cfg.find_one({'id': str(event.guild_id)})
-            assert g_cfg
+            g_cfg = await cfg.get(event.guild_id)
 
             if not g_cfg.setdefault('send_nowplaying_msg', False):
                 return
@@ -67,37 +209,18 @@ class EventHandler(BaseEventHandler):
             assert ch and client.cache
             if not d.queue.current:
                 return
-            embed = await generate_nowplaying_embed(event.guild_id, client.cache, lvc)
-            controls = client.rest.build_action_row()
-            (
-                controls.add_button(hk.ButtonStyle.SECONDARY, 'lyra_shuffle')
-                .set_emoji(erf['shuffle_b'])
-                .add_to_container()
-            )
-            (
-                controls.add_button(hk.ButtonStyle.SECONDARY, 'lyra_previous')
-                .set_emoji(erf['previous_b'])
-                .add_to_container()
-            )
-            (
-                controls.add_button(hk.ButtonStyle.PRIMARY, 'lyra_playpause')
-                .set_emoji(erf['resume_b'])
-                .add_to_container()
-            )
-            (
-                controls.add_button(hk.ButtonStyle.SECONDARY, 'lyra_skip')
-                .set_emoji(erf['skip_b'])
-                .add_to_container()
-            )
-            (
-                controls.add_button(hk.ButtonStyle.SUCCESS, 'lyra_repeat')
-                .set_emoji(get_repeat_emoji(q))
-                .add_to_container()
-            )
+            if d.nowplaying_components:
+                sync_controls(client.rest, erf, d)
+            else:
+                d.nowplaying_components = build_controls(client.rest, erf, q)
 
-            d.nowplaying_components = components = (controls,)
+            if g_cfg.get('edit_nowplaying_msg', False):
+                schedule_nowplaying_edit(event.guild_id, lvc, d)
+                return
+
+            embed = await generate_nowplaying_embed(event.guild_id, client.cache, lvc)
             d.nowplaying_msg = await client.rest.create_message(
-                ch, embed=embed, components=components
+                ch, embed=embed, components=d.nowplaying_components
             )
 
             # await asyncio.sleep(1)
@@ -106,54 +229,72 @@ class EventHandler(BaseEventHandler):
     async def track_finish(self, lvc: lv.Lavalink, event: lv.TrackFinish, /) -> None:
         if not await lvc.get_guild_node(event.guild_id):
             return
-        t = (await lvc.decode_track(event.track)).title
-        async with access_data(event.guild_id, lvc) as d:
-            q = d.queue
-            l = len(q)
+        t = (await decode_track(lvc, event.track)).title
+        d = await get_data(event.guild_id, lvc)
+        q = d.queue
+        l = len(q)
+        msg = d.nowplaying_msg
+        played_next = False
+
+        if q.is_stopped:
+            # The stopping task holds the guild's lock until this fires
+            logger.info(
+                f"In guild {event.guild_id} track [{q.pos: >3}/{l: >3}] stopped: '{t}'"
+            )
+            d.track_stopped.set()
+        else:
+            # Lets a command that stops the player meanwhile know that no other track end is coming
+            d.finish_pending = True
+            # Start the next track before anything else to keep the gap short
+            async with access_data(event.guild_id, lvc) as d:
+                d.finish_pending = False
+                try:
+                    if q.is_stopped:
+                        d.track_stopped.set()
+                    elif (curr_t := q.current) and curr_t.track.track == event.track:
+                        if next_t := q.next:
+                            await lvc.play(event.guild_id, next_t.track).start()
+                            played_next = True
+                        rep = q.repeat_mode
+                        if rep is RepeatMode.ALL:
+                            q.adv()
+                            q.wrap()
+                        elif rep is RepeatMode.NONE:
+                            q.adv()
+                    else:
+                        # A command has already moved on from the track that ended
+                        played_next = True
+                except QueueEmpty:
+                    pass
+                finally:
+                    logger.debug(
+                        f"In guild {event.guild_id} track [{q.pos: >3}/{l: >3}] ended  : '{t}'"
+                    )
+                    # d._track_finished_fired = True
 
-            client = get_client()
+        client = get_client()
 
-            cfg = client.get_type_dependency(LyraDBCollectionType)
-            assert not isinstance(cfg, al.abc.Undefined)
+        cfg = client.get_type_dependency(GuildConfigCache)
+        assert not isinstance(cfg, al.abc.Undefined)
 
-            g_cfg = cfg.find_one({'id': str(event.guild_id)})
-            assert g_cfg
+        g_cfg = await cfg.get(event.guild_id)
 
-            if g_cfg.get('send_nowplaying_msg', False) and (msg := d.nowplaying_msg):
-                ch = d.out_channel_id
-                assert ch
-                try:
-                    await client.rest.delete_messages(ch, msg)
-                finally:
-                    d.nowplaying_msg = d.nowplaying_components = None
+        if not (g_cfg.get('send_nowplaying_msg', False) and msg):
+            return
+        # An edited in place message is kept until the queue runs out
+        if g_cfg.get('edit_nowplaying_msg', False) and (played_next or q.is_stopped):
+            return
 
-            if q.is_stopped:
-                logger.info(
-                    f"In guild {event.guild_id} track [{q.pos: >3}/{l: >3}] stopped: '{t}'"
-                )
-                d.track_stopped_fired = True
-                return
-            try:
-                if next_t := q.next:
-                    await lvc.play(event.guild_id, next_t.track).start()
-                rep = q.repeat_mode
-                if rep is RepeatMode.ALL:
-                    q.adv()
-                    q.wrap()
-                elif rep is RepeatMode.NONE:
-                    q.adv()
-            except QueueEmpty:
-                return
-            finally:
-                logger.debug(
-                    f"In guild {event.guild_id} track [{q.pos: >3}/{l: >3}] ended  : '{t}'"
-                )
-                # d._track_finished_fired = True
+        try:
+            await client.rest.delete_messages(msg.channel_id, msg)
+        finally:
+            if d.nowplaying_msg is msg:
+                d.nowplaying_msg = None
 
     async def track_exception(
         self, lvc: lv.Lavalink, event: lv.TrackException, /
     ) -> None:
-        t_info = await lvc.decode_track(event.track)
+        t_info = await decode_track(lvc, event.track)
         d = await get_data(event.guild_id, lvc)
         l = len(d.queue)
 
@@ -171,13 +312,8 @@ class EventHandler(BaseEventHandler):
 
         client = get_client()
 
-        mgc = client.get_type_dependency(LyraDBClientType)
-        assert not isinstance(mgc, al.abc.Undefined)
-
-        upt = mgc.get_database(  # pyright: ignore [reportUnknownMemberType]
-            'internal'
-        ).get_collection('unplayable-tracks')
-        flt = {'identifier': t_info.identifier}
+        upt = client.get_type_dependency(UnplayableTracks)
+        assert not isinstance(upt, al.abc.Undefined)
 
         if not await lvc.get_guild_node(event.guild_id):
             return
@@ -191,13 +327,13 @@ class EventHandler(BaseEventHandler):
                     advance=False,
                     change_stop=False,
                 )
-            if d.queue.next:
-                f = asyncio.Task(wait_until_current_track_valid(event.guild_id, lvc))
-                await asyncio.wait_for(f, None)
 
+        if d.queue.next:
+            await wait_until_current_track_valid(event.guild_id, lvc)
+
+        async with access_data(event.guild_id, lvc) as d:
             d.queue.filter_rm(lambda t: t.track.info.identifier == t_info.identifier)
-            if not upt.find_one(flt):
-                upt.insert_one(flt)  # pyright: ignore [reportUnknownMemberType]
+            await upt.add(t_info.identifier)
 
             ch = d.out_channel_id
             msg = d.nowplaying_msg
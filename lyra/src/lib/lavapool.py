@@ -0,0 +1,175 @@
+import time
+import typing as t
+import asyncio
+import logging
+
+import attr as a
+import hikari as hk
+import lavasnek_rs as lv
+
+from .consts import NODE_STATS_TIMEOUT
+from .extras import Option, lgfmt
+from .errors import NotConnected, QueueEmpty
+from .lavautils import get_data
+
+
+logger = logging.getLogger(lgfmt(__name__))
+logger.setLevel(logging.DEBUG)
+
+
+@a.define
+class PoolNode:
+    name: str
+    lvc: lv.Lavalink
+    players: int = a.field(default=0, init=False)
+    cpu_load: float = a.field(default=0.0, init=False)
+    _last_seen: float = a.field(factory=time.monotonic, init=False)
+
+    @property
+    def alive(self) -> bool:
+        return time.monotonic() - self._last_seen < NODE_STATS_TIMEOUT
+
+    @property
+    def penalty(self) -> float:
+        return self.players + self.cpu_load * 100
+
+    def update(self, stats: lv.Stats, /) -> None:
+        self.players = stats.players
+        self.cpu_load = stats.cpu_lavalink_load
+        self._last_seen = time.monotonic()
+
+
+@a.define
+class LavalinkPool:
+    """Places every guild's player on the least loaded Lavalink node and otherwise acts like a `lv.Lavalink`"""
+
+    nodes: tuple[PoolNode, ...] = a.field(converter=tuple)
+    _placements: dict[hk.Snowflakeish, PoolNode] = a.field(factory=dict, init=False)
+    _monitor: Option[asyncio.Task[None]] = a.field(default=None, init=False)
+
+    def __getattr__(self, name: str) -> t.Any:
+        if not hasattr(lv.Lavalink, name):
+            raise AttributeError(name)
+
+        # Everything else on `lv.Lavalink` takes the guild's ID first
+        def dispatch(guild: hk.Snowflakeish, /, *args: t.Any, **kwargs: t.Any):
+            return getattr(self.of(guild), name)(guild, *args, **kwargs)
+
+        return dispatch
+
+    def least_loaded(self, *, exclude: Option[PoolNode] = None) -> Option[PoolNode]:
+        candidates = [n for n in self.nodes if n is not exclude]
+        alive = [n for n in candidates if n.alive]
+        return min(alive or candidates, key=lambda n: n.penalty, default=None)
+
+    def placed(self, guild: hk.Snowflakeish, /) -> Option[PoolNode]:
+        return self._placements.get(guild)
+
+    def place(self, guild: hk.Snowflakeish, /) -> lv.Lavalink:
+        """Places `guild` on the least loaded node unless it already is, which only joining voice should do"""
+        if (node := self._placements.get(guild)) is None:
+            node = self.least_loaded()
+            assert node
+            self._placements[guild] = node
+            # Counted until the next stats arrive, so a burst of joins spreads out
+            node.players += 1
+            logger.debug(f"In guild {guild} placed on Lavalink node '{node.name}'")
+        return node.lvc
+
+    def of(self, guild: hk.Snowflakeish, /) -> lv.Lavalink:
+        if node := self._placements.get(guild):
+            return node.lvc
+        # Guilds not in voice hold nothing on any node, so any of them will answer alike
+        return self._any()
+
+    def release(self, guild: hk.Snowflakeish, /) -> None:
+        if node := self._placements.pop(guild, None):
+            node.players = max(0, node.players - 1)
+
+    async def get_tracks(self, query: str, /) -> lv.Tracks:
+        return await self._any().get_tracks(query)
+
+    async def auto_search_tracks(self, query: str, /) -> lv.Tracks:
+        return await self._any().auto_search_tracks(query)
+
+    async def search_tracks(self, query: str, /) -> lv.Tracks:
+        return await self._any().search_tracks(query)
+
+    async def decode_track(self, track: str, /) -> lv.Info:
+        return await self._any().decode_track(track)
+
+    async def create_session(self, connection_info: lv.ConnectionInfo, /) -> None:
+        await self.place(connection_info.guild_id).create_session(connection_info)
+
+    def raw_handle_event_voice_state_update(
+        self,
+        guild: hk.Snowflakeish,
+        user: hk.Snowflakeish,
+        session_id: str,
+        channel: Option[hk.Snowflakeish],
+        /,
+    ) -> None:
+        # Every member's voice activity comes through here, but only guilds being played in matter
+        if node := self.placed(guild):
+            node.lvc.raw_handle_event_voice_state_update(
+                guild, user, session_id, channel
+            )
+
+    async def raw_handle_event_voice_server_update(
+        self, guild: hk.Snowflakeish, endpoint: str, token: str, /
+    ) -> None:
+        if node := self.placed(guild):
+            await node.lvc.raw_handle_event_voice_server_update(guild, endpoint, token)
+
+    def _any(self) -> lv.Lavalink:
+        node = self.least_loaded()
+        assert node
+        return node.lvc
+
+    def start_monitoring(self) -> None:
+        if self._monitor is None and len(self.nodes) > 1:
+            self._monitor = asyncio.create_task(self._watch_nodes())
+
+    async def _watch_nodes(self) -> None:
+        while True:
+            await asyncio.sleep(NODE_STATS_TIMEOUT)
+            for guild, node in [*self._placements.items()]:
+                if not node.alive:
+                    await self.failover(guild)
+
+    async def failover(self, guild: hk.Snowflakeish, /) -> None:
+        if not (old := self._placements.get(guild)):
+            return
+        if not ((new := self.least_loaded(exclude=old)) and new.alive):
+            logger.error(f"In guild {guild} no Lavalink node is left to fail over to")
+            return
+
+        try:
+            data = await get_data(guild, old.lvc)
+        except NotConnected:
+            self.release(guild)
+            return
+
+        conn = await old.lvc.wait_for_full_connection_info_insert(guild)
+        self._placements[guild] = new
+        old.players = max(0, old.players - 1)
+        new.players += 1
+        await new.lvc.create_session(conn)
+
+        eq = data.equalizer
+        await new.lvc.volume(guild, eq.volume * 10)
+        await new.lvc.equalize_all(guild, [*eq.bands])
+
+        q = data.queue
+        try:
+            if (curr_t := q.current) and not q.is_stopped:
+                builder = new.lvc.play(guild, curr_t.track)
+                await builder.start_time_millis(q.np_position or 0).start()
+                if q.is_paused:
+                    await new.lvc.pause(guild)
+        except QueueEmpty:
+            pass
+
+        logger.warning(
+            f"In guild {guild} failed over from Lavalink node '{old.name}' to '{new.name}'"
+        )
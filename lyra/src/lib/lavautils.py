@@ -3,6 +3,7 @@ import enum as e
 import random as rd
 import typing as t
 import asyncio
+import logging
 import datetime as dt
 import contextlib as ctxlib
 
@@ -11,21 +12,38 @@ import attr as a
 import hikari as hk
 import lavasnek_rs as lv
 
-from .consts import STOP_REFRESH
+from .consts import (
+    ART_CACHE_PATH,
+    ART_CACHE_ROWS,
+    PREFETCH_LEAD,
+    TRACK_EVENT_TIMEOUT,
+    TRACK_INFOS_CACHE_SIZE,
+    TRACKS_CACHE_SIZE,
+    TRACKS_CACHE_TTL,
+)
 from .utils import GuildOrInferable, infer_guild, limit_img_size_by_guild
 from .errors import NotConnected, QueueEmpty
 from .extras import (
     Option,
     RGBTriplet,
+    SingleflightCache,
+    SQLiteCache,
+    TTLCache,
     get_img_pallete,
     get_thumbnail,
     curr_time_ms,
     split_preset,
     inj_glob,
+    lgfmt,
     to_stamp,
+    url_regex,
+    url_to_bytes,
 )
 
 
+logger = logging.getLogger(lgfmt(__name__))
+logger.setLevel(logging.DEBUG)
+
 all_repeat_modes: t.Final = split_preset('off|0,one|o|1,all|a|q')
 repeat_emojis: t.Final[list[hk.KnownCustomEmoji]] = []
 
@@ -130,6 +148,15 @@ class QueueList(list[lv.TrackQueue]):
     def ext(self, *tracks: lv.TrackQueue) -> None:
         self.extend(tracks)
 
+    def ext_after(self, anchor: lv.TrackQueue, *tracks: lv.TrackQueue) -> None:
+        """Inserts `tracks` right after `anchor`, but never before the current track, or at the end if `anchor` is no longer queued"""
+        i = next((i for i, t in enumerate(self) if t is anchor), None)
+        if i is None:
+            self.ext(*tracks)
+            return
+        i = max(i, self.pos) + 1
+        self[i:i] = tracks
+
     def sub(self, *tracks: lv.TrackQueue) -> None:
         for t in tracks:
             self.remove(t)
@@ -196,19 +223,45 @@ class QueueList(list[lv.TrackQueue]):
     def update_paused_np_position(self, value: int = 0):
         self._paused_np_position = value
 
-    @property
-    def curr_t_palette(self) -> tuple[RGBTriplet, ...]:
-        img = self.curr_t_thumbnail
-        if not img:
-            return (((0,) * 3),) * 3
-        c = get_img_pallete(img)
-        return c
+    async def curr_t_palette(self) -> tuple[RGBTriplet, ...]:
+        np = self.current
+        assert np
+        return await get_track_palette(np)
 
-    @property
-    def curr_t_thumbnail(self):
+    async def curr_t_thumbnail(self):
         np = self.current
         assert np
-        return get_thumbnail(np.track.info)
+        return await get_track_thumbnail(np)
+
+
+art_cache: t.Final = SQLiteCache(ART_CACHE_PATH, ART_CACHE_ROWS)
+
+
+async def get_track_thumbnail(track: lv.TrackQueue, /):
+    info = track.track.info
+    if url := await art_cache.get(f'thumbnail:{info.identifier}'):
+        return t.cast(str, url)
+
+    img = await get_thumbnail(info)
+    # Embedded album arts are raw bytes, only the URLs are worth persisting
+    if isinstance(img, str):
+        await art_cache.set(f'thumbnail:{info.identifier}', img)
+    return img
+
+
+async def get_track_palette(track: lv.TrackQueue, /) -> tuple[RGBTriplet, ...]:
+    key = f'palette:{track.track.info.identifier}'
+    if palette := await art_cache.get(key):
+        return (*((*c,) for c in palette),)
+
+    img = await get_track_thumbnail(track)
+    if not img:
+        return (((0,) * 3),) * 3
+    if isinstance(img, str):
+        img = await url_to_bytes(img)
+    palette = await get_img_pallete(img)
+    await art_cache.set(key, palette)
+    return palette
 
 
 @a.s(frozen=True, auto_attribs=False, auto_detect=True)
@@ -295,6 +348,27 @@ class Equalizer(object):
         self.volume -= amount
 
 
+@a.define
+class GuildLock:
+    """A first-come-first-served lock that the task already holding it may re-enter"""
+
+    _lock: asyncio.Lock = a.field(factory=asyncio.Lock, init=False)
+    _owner: Option[asyncio.Task[t.Any]] = a.field(default=None, init=False)
+
+    @ctxlib.asynccontextmanager
+    async def hold(self):
+        if (task := asyncio.current_task()) is self._owner:
+            yield
+            return
+
+        async with self._lock:
+            self._owner = task
+            try:
+                yield
+            finally:
+                self._owner = None
+
+
 @a.define
 class NodeData:
     queue: QueueList = a.field(factory=QueueList, init=False)
@@ -305,8 +379,16 @@ class NodeData:
     nowplaying_components: Option[t.Sequence[hk.api.ActionRowBuilder]] = a.field(
         default=None, init=False
     )
-    track_stopped_fired: bool = a.field(factory=bool, init=False)
+    track_started: asyncio.Event = a.field(factory=asyncio.Event, init=False)
+    track_stopped: asyncio.Event = a.field(factory=asyncio.Event, init=False)
     dc_on_purpose: bool = a.field(factory=bool, init=False)
+    finish_pending: bool = a.field(factory=bool, init=False)
+    prefetch_task: Option[asyncio.Task[None]] = a.field(default=None, init=False)
+    nowplaying_task: Option[asyncio.Task[None]] = a.field(default=None, init=False)
+    prefetched_embed: Option[tuple[lv.TrackQueue, hk.Embed]] = a.field(
+        default=None, init=False
+    )
+    lock: GuildLock = a.field(factory=GuildLock, init=False, repr=False)
     ...
 
     async def edit_now_playing_components(
@@ -341,53 +423,122 @@ class BaseEventHandler(abc.ABC):
         ...
 
 
+_node_data: t.Final[dict[hk.Snowflakeish, NodeData]] = {}
+"""Authoritative in-process state of every connected guild, so that the command path never has to cross into lavasnek for it"""
+
+
 async def get_data(guild: hk.Snowflakeish, lvc: lv.Lavalink, /) -> NodeData:
+    if (data := _node_data.get(guild)) is not None:
+        return data
+
     node = await lvc.get_guild_node(guild)
     if not node:
         raise NotConnected
     data = node.get_data() or NodeData()
     assert isinstance(data, NodeData)
+    node.set_data(data)
+    _node_data[guild] = data
     return data
 
 
 async def set_data(guild: hk.Snowflakeish, lvc: lv.Lavalink, data: NodeData, /) -> None:
-    node = await lvc.get_guild_node(guild)
-    if not node:
+    if guild not in _node_data:
         raise NotConnected
-    node.set_data(data)
+    _node_data[guild] = data
+
+
+def release_data(guild: hk.Snowflakeish, /) -> Option[NodeData]:
+    if data := _node_data.pop(guild, None):
+        for task in (data.prefetch_task, data.nowplaying_task):
+            if task:
+                task.cancel()
+    return data
 
 
 @ctxlib.asynccontextmanager
 async def access_queue(g_inf: GuildOrInferable, lvc: lv.Lavalink, /):
     data = await get_data(g := infer_guild(g_inf), lvc)
-    try:
-        yield data.queue
-    finally:
-        await set_data(g, lvc, data)
+    async with data.lock.hold():
+        try:
+            yield data.queue
+        finally:
+            await set_data(g, lvc, data)
 
 
 @ctxlib.asynccontextmanager
 async def access_equalizer(g_inf: GuildOrInferable, lvc: lv.Lavalink, /):
     data = await get_data(g := infer_guild(g_inf), lvc)
-    try:
-        yield data.equalizer
-    finally:
-        await set_data(g, lvc, data)
+    async with data.lock.hold():
+        try:
+            yield data.equalizer
+        finally:
+            await set_data(g, lvc, data)
 
 
 @ctxlib.asynccontextmanager
 async def access_data(g_inf: GuildOrInferable, lvc: lv.Lavalink, /):
     data = await get_data(g := infer_guild(g_inf), lvc)
-    try:
-        yield data
-    finally:
-        await set_data(g, lvc, data)
+    async with data.lock.hold():
+        try:
+            yield data
+        finally:
+            await set_data(g, lvc, data)
 
 
 async def get_queue(g_inf: GuildOrInferable, lvc: lv.Lavalink, /) -> QueueList:
     return (await get_data(infer_guild(g_inf), lvc)).queue
 
 
+tracks_cache: t.Final[TTLCache[tuple[str, str], lv.Tracks]] = TTLCache(
+    TRACKS_CACHE_SIZE, TRACKS_CACHE_TTL
+)
+_tracks_loads: t.Final[SingleflightCache[tuple[str, str], lv.Tracks]] = (
+    SingleflightCache(tracks_cache, keep=lambda tracks: bool(tracks.tracks))
+)
+
+
+def _normalize_query(query: str, /) -> str:
+    query = query.strip()
+    if url_regex.fullmatch(query):
+        return query
+    return ' '.join(query.casefold().split())
+
+
+async def _load_tracks_cached(
+    key: tuple[str, str], loader: t.Callable[[], t.Awaitable[lv.Tracks]], /
+) -> lv.Tracks:
+    return await _tracks_loads.get(key, loader)
+
+
+async def get_tracks(lvc: lv.Lavalink, query: str, /) -> lv.Tracks:
+    return await _load_tracks_cached(
+        ('load', _normalize_query(query)), lambda: lvc.get_tracks(query)
+    )
+
+
+async def auto_search_tracks(lvc: lv.Lavalink, query: str, /) -> lv.Tracks:
+    return await _load_tracks_cached(
+        ('auto', _normalize_query(query)), lambda: lvc.auto_search_tracks(query)
+    )
+
+
+track_infos: t.Final[TTLCache[str, lv.Info]] = TTLCache(TRACK_INFOS_CACHE_SIZE)
+
+
+def remember_tracks(*tracks: lv.Track) -> None:
+    for t_ in tracks:
+        track_infos.set(t_.track, t_.info)
+
+
+async def decode_track(lvc: lv.Lavalink, track: str, /) -> lv.Info:
+    if (info := track_infos.get(track)) is not None:
+        return info
+
+    info = await lvc.decode_track(track)
+    track_infos.set(track, info)
+    return info
+
+
 def get_repeat_emoji(q: QueueList, /):
     return (
         repeat_emojis[0]
@@ -397,14 +548,24 @@ def get_repeat_emoji(q: QueueList, /):
 
 
 async def generate_nowplaying_embed(
-    guild_id: hk.Snowflakeish, cache: hk.api.Cache, lvc: lv.Lavalink, /
+    guild_id: hk.Snowflakeish,
+    cache: hk.api.Cache,
+    lvc: lv.Lavalink,
+    /,
+    *,
+    track: Option[lv.TrackQueue] = None,
 ):
     q = await get_queue(guild_id, lvc)
     # e = '⏹️' if q.is_stopped else ('▶️' if q.is_paused else '⏸️')
 
-    curr_t = q.current
+    curr_t = track or q.current
     assert curr_t
 
+    if (pre := (await get_data(guild_id, lvc)).prefetched_embed) and pre[0] is curr_t:
+        embed = pre[1]
+        embed.timestamp = dt.datetime.now().astimezone()
+        return embed
+
     t_info = curr_t.track.info
     req = cache.get_member(guild_id, curr_t.requester)
     # print(curr_t.requester)
@@ -414,14 +575,14 @@ async def generate_nowplaying_embed(
     # np_pos = q.np_position // 1_000
     # now = int(time.time())
 
-    if thumb := q.curr_t_thumbnail:
-        thumb = limit_img_size_by_guild(thumb, guild_id, cache)
+    if thumb := await get_track_thumbnail(curr_t):
+        thumb = await limit_img_size_by_guild(thumb, guild_id, cache)
     embed = (
         hk.Embed(
             title=f"🎧 {t_info.title}",
             description=f'📀 **{t_info.author}** ({song_len})',
             url=t_info.uri,
-            color=q.curr_t_palette[0],
+            color=(await get_track_palette(curr_t))[0],
             timestamp=dt.datetime.now().astimezone(),
         )
         .set_author(name="Currently playing")
@@ -434,9 +595,55 @@ async def generate_nowplaying_embed(
     return embed
 
 
-async def wait_until_current_track_valid(g_inf: GuildOrInferable, lvc: lv.Lavalink, /):
-    while True:
-        d = await get_data(infer_guild(g_inf), lvc)
-        if d.queue.current and d.out_channel_id:
+async def wait_until_current_track_valid(
+    g_inf: GuildOrInferable, lvc: lv.Lavalink, /
+) -> bool:
+    d = await get_data(infer_guild(g_inf), lvc)
+
+    async def _wait():
+        while not (d.queue.current and d.out_channel_id):
+            d.track_started.clear()
+            await d.track_started.wait()
+
+    try:
+        await asyncio.wait_for(_wait(), TRACK_EVENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def schedule_prefetch(
+    guild: hk.Snowflakeish, cache: hk.api.Cache, lvc: lv.Lavalink, data: NodeData, /
+) -> None:
+    if data.prefetch_task:
+        data.prefetch_task.cancel()
+    data.prefetch_task = asyncio.create_task(_prefetch_next(guild, cache, lvc, data))
+
+
+async def _prefetch_next(
+    guild: hk.Snowflakeish, cache: hk.api.Cache, lvc: lv.Lavalink, data: NodeData, /
+) -> None:
+    q = data.queue
+    try:
+        if not (curr_t := q.current) or (np_pos := q.np_position) is None:
             return
-        await asyncio.sleep(STOP_REFRESH)
+        left = (curr_t.track.info.length - np_pos) / 1_000
+        await asyncio.sleep(max(0, left - PREFETCH_LEAD))
+
+        if not (next_t := q.next) or next_t is curr_t:
+            return
+    except QueueEmpty:
+        return
+
+    try:
+        await get_track_palette(next_t)
+        embed = await generate_nowplaying_embed(guild, cache, lvc, track=next_t)
+    except (AssertionError, NotConnected, QueueEmpty):
+        return
+    except Exception as exc:
+        # Only a head start, the track start fetches whatever is missing again
+        logger.warning(
+            f"In guild {guild} prefetching '{next_t.track.info.title}' failed: {exc!r}"
+        )
+        return
+    data.prefetched_embed = (next_t, embed)
@@ -260,7 +260,7 @@ async def generate_queue_embeds(
         )
     )
 
-    color = None if q.is_paused or not q.current else q.curr_t_palette[2]
+    color = None if q.is_paused or not q.current else (await q.curr_t_palette())[2]
 
     _base_embed = hk.Embed(title="💿 Queue", description=desc, color=color,).set_footer(
         f"Queue Duration: {to_stamp(queue_elapsed)} / {to_stamp(queue_durr)} ({to_stamp(queue_eta)} Left)"
@@ -1,12 +1,13 @@
 import typing as t
 import asyncio
+import logging
 import contextlib as ctxlib
 
 import tanjun as tj
 import lavasnek_rs as lv
 
-from .consts import STOP_REFRESH
-from .extras import Option
+from .consts import TRACK_EVENT_TIMEOUT
+from .extras import Option, lgfmt
 from .utils import (
     ButtonBuilderType,
     Contextish,
@@ -33,6 +34,10 @@ from .lavautils import (
 )
 
 
+logger = logging.getLogger(lgfmt(__name__))
+logger.setLevel(logging.DEBUG)
+
+
 async def stop(g_inf: GuildOrInferable, lvc: lv.Lavalink, /) -> None:
     async with access_queue(g_inf, lvc) as q:
         q.is_stopped = True
@@ -46,6 +51,11 @@ async def stop_in_ctxmng(
     g = infer_guild(g_inf)
 
     data.queue.is_stopped = True
+    if data.finish_pending:
+        # The track has already ended on its own, so stopping it fires no more events
+        data.track_stopped.set()
+    else:
+        data.track_stopped.clear()
     await set_data(g, lvc, data)
     await lvc.stop(g)
 
@@ -59,9 +69,17 @@ async def unstop(ctx: tj.abc.Context, lvc: lv.Lavalink, /) -> None:
 async def wait_for_track_finish_event_fire(
     g_inf: GuildOrInferable, lvc: lv.Lavalink, data: NodeData, /
 ):
-    while not (await get_data(infer_guild(g_inf), lvc)).track_stopped_fired:
-        await asyncio.sleep(STOP_REFRESH)
-    data.track_stopped_fired = False
+    d = await get_data(g := infer_guild(g_inf), lvc)
+    try:
+        await asyncio.wait_for(d.track_stopped.wait(), TRACK_EVENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Carries on regardless, but a missing event usually means the node is lagging or gone
+        logger.warning(
+            f"In guild {g} the track did not finish within {TRACK_EVENT_TIMEOUT}s of being stopped"
+        )
+    finally:
+        d.track_stopped.clear()
+        data.track_stopped.clear()
 
 
 @ctxlib.asynccontextmanager
@@ -93,39 +111,38 @@ async def set_pause(
         erf = client.get_type_dependency(EmojiRefs)
         assert erf
 
-        d = await get_data(g, lvc)
-        q = d.queue
-        if q.is_stopped:
-            if strict:
-                raise TrackStopped
-            return
-        if pause is None:
-            pause = not q.is_paused
-        if respond:
-            if pause and q.is_paused:
-                await err_say(g_r_inf, content="❗ Already paused")
-                return
-            if not (pause or q.is_paused):
-                await err_say(g_r_inf, content="❗ Already resumed")
+        async with access_data(g, lvc) as d:
+            q = d.queue
+            if q.is_stopped:
+                if strict:
+                    raise TrackStopped
                 return
+            if pause is None:
+                pause = not q.is_paused
+            if respond:
+                if pause and q.is_paused:
+                    await err_say(g_r_inf, content="❗ Already paused")
+                    return
+                if not (pause or q.is_paused):
+                    await err_say(g_r_inf, content="❗ Already resumed")
+                    return
+
+            np_pos = q.np_position
+            if np_pos is None:
+                raise NotPlaying
+
+            q.is_paused = pause
+            if pause:
+                q.update_paused_np_position(np_pos)
+                await lvc.pause(g)
+                e = '▶️'
+                msg = "Paused"
+            else:
+                q.update_curr_t_started(-np_pos)
+                await lvc.resume(g)
+                e = '⏸️'
+                msg = "Resumed"
 
-        np_pos = q.np_position
-        if np_pos is None:
-            raise NotPlaying
-
-        q.is_paused = pause
-        if pause:
-            q.update_paused_np_position(np_pos)
-            await lvc.pause(g)
-            e = '▶️'
-            msg = "Paused"
-        else:
-            q.update_curr_t_started(-np_pos)
-            await lvc.resume(g)
-            e = '⏸️'
-            msg = "Resumed"
-
-        await set_data(g, lvc, d)
         if respond:
             if isinstance(g_r_inf, Contextish):
                 await say(g_r_inf, show_author=True, content=f"{e} {msg}")
@@ -1,7 +1,10 @@
 import typing as t
+import asyncio
 import logging
+import weakref as wr
 import difflib as dfflib
 
+import hikari as hk
 import tanjun as tj
 import alluka as al
 import lavasnek_rs as lv
@@ -16,13 +19,19 @@ from .utils import (
     say,
     trigger_thinking,
 )
-from .consts import ADD_TRACKS_WRAP_LIM
+from .consts import (
+    ADD_TRACKS_WRAP_LIM,
+    ENQUEUE_CHUNK,
+    TRACK_LOADS_GUILD_LIM,
+    TRACK_LOADS_LIM,
+)
 from .extras import NULL, MaybeIterable, Option, Result, lgfmt, url_regex, join_and
 from .errors import (
     Argument,
     IllegalArgument,
     InvalidArgument,
     NoPlayableTracks,
+    NotConnected,
     OthersInVoice,
     PlaybackChangeRefused,
 )
@@ -34,16 +43,30 @@ from .lavautils import (
     repeat_emojis,
     access_data,
     access_queue,
-    get_data,
-    set_data,
+    get_tracks,
+    remember_tracks,
 )
 from .playback import back, skip, while_stop
-from .dataimpl import LyraDBClientType
+from .dataimpl import UnplayableTracks
 
 
 logger = logging.getLogger(lgfmt(__name__))
 logger.setLevel(logging.DEBUG)
 
+_loads_sema: t.Final = asyncio.Semaphore(TRACK_LOADS_LIM)
+_guild_loads_semas: t.Final[
+    wr.WeakValueDictionary[hk.Snowflakeish, asyncio.Semaphore]
+] = wr.WeakValueDictionary()
+_enqueue_tasks: t.Final[set[asyncio.Task[None]]] = set()
+
+
+def _guild_loads_sema(guild: Option[hk.Snowflakeish], /) -> asyncio.Semaphore:
+    if guild is None:
+        return asyncio.Semaphore(TRACK_LOADS_GUILD_LIM)
+    if (sema := _guild_loads_semas.get(guild)) is None:
+        sema = _guild_loads_semas[guild] = asyncio.Semaphore(TRACK_LOADS_GUILD_LIM)
+    return sema
+
 
 async def to_tracks(
     ctx: EitherContext,
@@ -55,22 +78,24 @@ async def to_tracks(
 ) -> Result[tuple[Trackish, ...]]:
     if source is None:
         source = 'yt'
-    tracks: list[Trackish] = []
-    errors: list[ValueError] = []
     songs = (*map(lambda s: s.strip("<>|"), value.split(' | ')),)
+    guild_sema = _guild_loads_sema(ctx.guild_id)
+
+    async def _load(song: str, /) -> Option[Trackish]:
+        query = song if url_regex.fullmatch(song) else '%ssearch:%s' % (source, song)
+        async with guild_sema, _loads_sema:
+            result = await get_tracks(lvc, query)
+        if not result.tracks:
+            return None
+        if result.load_type == 'PLAYLIST_LOADED':
+            return result
+        return result.tracks[0]
+
     async with trigger_thinking(ctx):
-        for song in songs:
-            query = (
-                song if url_regex.fullmatch(song) else '%ssearch:%s' % (source, song)
-            )
-            query = await lvc.get_tracks(query)
-            if not query.tracks:
-                errors.append(ValueError(song))
-                continue
-            if query.load_type == 'PLAYLIST_LOADED':
-                tracks.append(query)
-                continue
-            tracks.append(query.tracks[0])
+        loaded = await asyncio.gather(*map(_load, songs))
+
+    tracks = [t_ for t_ in loaded if t_ is not None]
+    errors = [ValueError(s) for s, t_ in zip(songs, loaded) if t_ is None]
     if errors:
         raise tj.ConversionError('Some query returns no results', value, errors)
     return (*tracks,)
@@ -118,25 +143,18 @@ async def add_tracks_(
             continue
         flttn_t.append(t_)
 
-    mgc = ctx.get_type_dependency(LyraDBClientType)
-    assert not isinstance(mgc, al.abc.Undefined)
-
-    upt = mgc.get_database(  # pyright: ignore [reportUnknownMemberType]
-        'internal'
-    ).get_collection('unplayable-tracks')
-    upt_: set[str] = {_upt['identifier'] for _upt in upt.find()}
+    upt = ctx.get_type_dependency(UnplayableTracks)
+    assert not isinstance(upt, al.abc.Undefined)
 
-    safe_flttn_t = (*(t_ for t_ in flttn_t if t_.info.identifier not in upt_),)
+    safe_flttn_t = (*(t_ for t_ in flttn_t if t_.info.identifier not in upt),)
     if not safe_flttn_t:
         raise NoPlayableTracks
+    remember_tracks(*safe_flttn_t)
 
-    players = (
-        *(
-            lvc.play(ctx.guild_id, t_).requester(ctx.author.id).replace(False)
-            for t_ in safe_flttn_t
-        ),
-    )
-    queue.ext(*map(lambda p: p.to_track_queue(), players))
+    now_t, later_t = safe_flttn_t[:ENQUEUE_CHUNK], safe_flttn_t[ENQUEUE_CHUNK:]
+    players = (*(_to_player(ctx, lvc, t_) for t_ in now_t),)
+    now_q = (*(p.to_track_queue() for p in players),)
+    queue.ext(*now_q)
 
     if respond:
         playlists = frozenset(t_ for t_ in tracks_ if isinstance(t_, lv.Tracks))
@@ -163,6 +181,8 @@ async def add_tracks_(
         enqueued_txt = join_and((sgl_track_txt, playlist_txt))
         plus_e = "**`＋`**" if len(safe_flttn_t) <= 1 else "**`≡+`**"
         txt = shuffle_txt % (f"{plus_e} Added {enqueued_txt}")
+        if later_t:
+            txt += f" `(Loading {len(later_t)} more tracks in the background...)`"
         await say(ctx, follow_up=True, content=txt)
 
         if (diff := (len(flttn_t) - len(safe_flttn_t))) >= 1:
@@ -176,12 +196,69 @@ async def add_tracks_(
     first = players[0]
     if not queue.is_stopped or ignore_stop:
         await first.start()
-    if shuffle:
+    if later_t:
+        # Shuffled once the rest is in, so that it mixes with the tracks enqueued up-front
+        task = asyncio.create_task(
+            _enqueue_in_background(
+                ctx, lvc, later_t, now_q[-1], respond=respond, shuffle=shuffle
+            )
+        )
+        _enqueue_tasks.add(task)
+        task.add_done_callback(_enqueue_tasks.discard)
+    elif shuffle:
         queue.shuffle()
 
     return (*safe_flttn_t,)
 
 
+def _to_player(
+    ctx: tj.abc.Context, lvc: lv.Lavalink, track: lv.Track, /
+) -> lv.PlayBuilder:
+    assert ctx.guild_id
+    return lvc.play(ctx.guild_id, track).requester(ctx.author.id).replace(False)
+
+
+async def _enqueue_in_background(
+    ctx: tj.abc.Context,
+    lvc: lv.Lavalink,
+    tracks: tuple[lv.Track, ...],
+    after: lv.TrackQueue,
+    /,
+    *,
+    respond: bool = False,
+    shuffle: bool = False,
+) -> None:
+    for i in range(0, len(tracks), ENQUEUE_CHUNK):
+        # Let playback and other commands through between chunks
+        await asyncio.sleep(0)
+        chunk = (
+            *(
+                _to_player(ctx, lvc, t_).to_track_queue()
+                for t_ in tracks[i : i + ENQUEUE_CHUNK]
+            ),
+        )
+        try:
+            async with access_queue(ctx, lvc) as q:
+                # Kept together with the rest of the playlist, ahead of anything enqueued since
+                q.ext_after(after, *chunk)
+                if shuffle and i + ENQUEUE_CHUNK >= len(tracks):
+                    q.shuffle()
+        except NotConnected:
+            return
+        after = chunk[-1]
+
+    logger.debug(
+        f"In guild {ctx.guild_id} finished enqueuing {len(tracks)} tracks in the background"
+    )
+    if respond:
+        await say(
+            ctx,
+            follow_up=True,
+            hidden=True,
+            content=f"≡ Finished loading `{len(tracks)}` more tracks into the queue",
+        )
+
+
 async def remove_track(
     ctx: tj.abc.Context, track: Option[str], lvc: lv.Lavalink, /
 ) -> lv.TrackQueue:
@@ -189,48 +266,49 @@ async def remove_track(
 
     assert ctx.guild_id
 
-    d = await get_data(ctx.guild_id, lvc)
-    q = d.queue
-    np = q.current
-    if track is None:
-        if not np:
-            raise InvalidArgument(Argument(track, None))
-        rm = np
-        i = q.pos
-    elif track.isdigit():
-        t = int(track)
-        if not (1 <= t <= len(q)):
-            raise IllegalArgument(Argument(t, (1, len(q))))
-        i = t - 1
-        rm = q[i]
-    else:
-        rm = max(
-            q,
-            key=lambda t: dfflib.SequenceMatcher(
-                None, t.track.info.title, track
-            ).ratio(),
+    async with access_data(ctx, lvc) as d:
+        q = d.queue
+        np = q.current
+        if track is None:
+            if not np:
+                raise InvalidArgument(Argument(track, None))
+            rm = np
+            i = q.pos
+        elif track.isdigit():
+            t = int(track)
+            if not (1 <= t <= len(q)):
+                raise IllegalArgument(Argument(t, (1, len(q))))
+            i = t - 1
+            rm = q[i]
+        else:
+            rm = max(
+                q,
+                key=lambda t: dfflib.SequenceMatcher(
+                    None, t.track.info.title, track
+                ).ratio(),
+            )
+            i = q.index(rm)
+
+        try:
+            await others_not_in_vc_check(ctx, lvc)
+        except OthersInVoice:
+            if rm.requester != ctx.author.id:
+                raise PlaybackChangeRefused
+
+        if rm == np:
+            async with while_stop(ctx, lvc, d):
+                await skip(
+                    ctx, lvc, advance=False, reset_repeat=True, change_stop=False
+                )
+
+        if i < q.pos:
+            q.pos = max(0, q.pos - 1)
+        q.sub(rm)
+
+        logger.info(
+            f"In guild {ctx.guild_id} track [{i: >3}+1/{len(q)}] removed: '{rm.track.info.title}'"
         )
-        i = q.index(rm)
 
-    try:
-        await others_not_in_vc_check(ctx, lvc)
-    except OthersInVoice:
-        if rm.requester != ctx.author.id:
-            raise PlaybackChangeRefused
-
-    if rm == np:
-        async with while_stop(ctx, lvc, d):
-            await skip(ctx, lvc, advance=False, reset_repeat=True, change_stop=False)
-
-    if i < q.pos:
-        q.pos = max(0, q.pos - 1)
-    q.sub(rm)
-
-    logger.info(
-        f"In guild {ctx.guild_id} track [{i: >3}+1/{len(q)}] removed: '{rm.track.info.title}'"
-    )
-
-    await set_data(ctx.guild_id, lvc, d)
     return rm
 
 
@@ -241,30 +319,29 @@ async def remove_tracks(
 
     assert ctx.guild_id
 
-    d = await get_data(ctx.guild_id, lvc)
-    q = d.queue
-    if not (1 <= start <= end <= len(q)):
-        raise IllegalArgument(Argument((start, end), (1, len(q))))
-
-    i_s = start - 1
-    i_e = end - 1
-    # t_n = end - i_s
-    rm = q[i_s:end]
-    if q.current in rm:
-        q.reset_repeat()
-        async with while_stop(ctx, lvc, d):
-            if next_t := None if len(q) <= end else q[end]:
-                await set_pause(ctx, lvc, pause=False)
-                await lvc.play(ctx.guild_id, next_t.track).start()
-    if i_s < q.pos:
-        q.pos = max(0, i_s + (q.pos - i_e - 1))
-    q.sub(*rm)
-
-    logger.info(
-        f"""In guild {ctx.guild_id} tracks [{i_s: >3}~{i_e: >3}/{len(q)}] removed: '{', '.join(("'%s'" %  t.track.info.title) for t in rm)}'"""
-    )
+    async with access_data(ctx, lvc) as d:
+        q = d.queue
+        if not (1 <= start <= end <= len(q)):
+            raise IllegalArgument(Argument((start, end), (1, len(q))))
+
+        i_s = start - 1
+        i_e = end - 1
+        # t_n = end - i_s
+        rm = q[i_s:end]
+        if q.current in rm:
+            q.reset_repeat()
+            async with while_stop(ctx, lvc, d):
+                if next_t := None if len(q) <= end else q[end]:
+                    await set_pause(ctx, lvc, pause=False)
+                    await lvc.play(ctx.guild_id, next_t.track).start()
+        if i_s < q.pos:
+            q.pos = max(0, i_s + (q.pos - i_e - 1))
+        q.sub(*rm)
+
+        logger.info(
+            f"""In guild {ctx.guild_id} tracks [{i_s: >3}~{i_e: >3}/{len(q)}] removed: '{', '.join(("'%s'" %  t.track.info.title) for t in rm)}'"""
+        )
 
-    await set_data(ctx.guild_id, lvc, d)
     return rm
 
 
@@ -287,42 +364,43 @@ async def insert_track(
 ) -> lv.TrackQueue:
     assert ctx.guild_id
 
-    d = await get_data(ctx.guild_id, lvc)
-    q = d.queue
-    np = q.current
-    p_ = q.pos
-    if track is None:
-        if not np:
-            raise InvalidArgument(Argument(np, track))
-        t_ = p_
-        ins = np
-    else:
-        t_ = track - 1
-        ins = q[t_]
+    async with access_data(ctx, lvc) as d:
+        q = d.queue
+        np = q.current
+        p_ = q.pos
+        if track is None:
+            if not np:
+                raise InvalidArgument(Argument(np, track))
+            t_ = p_
+            ins = np
+        else:
+            t_ = track - 1
+            ins = q[t_]
 
-    i_ = insert - 1
-    if t_ in {i_, insert}:
-        raise ValueError
-    if not ((0 <= t_ < len(q)) and (0 <= i_ < len(q))):
-        raise IllegalArgument(Argument((track, insert), (1, len(q))))
+        i_ = insert - 1
+        if t_ in {i_, insert}:
+            raise ValueError
+        if not ((0 <= t_ < len(q)) and (0 <= i_ < len(q))):
+            raise IllegalArgument(Argument((track, insert), (1, len(q))))
 
-    if t_ < p_ <= i_:
-        q.decr()
-    elif i_ < p_ < t_:
-        q.adv()
+        if t_ < p_ <= i_:
+            q.decr()
+        elif i_ < p_ < t_:
+            q.adv()
 
-    elif i_ < p_ == t_:
-        await back(ctx, lvc, advance=False, reset_repeat=True)
+        elif i_ < p_ == t_:
+            await back(ctx, lvc, advance=False, reset_repeat=True)
 
-    elif p_ == t_ < i_:
-        async with while_stop(ctx, lvc, d):
-            await skip(ctx, lvc, advance=False, reset_repeat=True, change_stop=False)
+        elif p_ == t_ < i_:
+            async with while_stop(ctx, lvc, d):
+                await skip(
+                    ctx, lvc, advance=False, reset_repeat=True, change_stop=False
+                )
 
-    q[t_] = NULL  # pyright: ignore [reportGeneralTypeIssues]
-    q.insert(insert, ins)
-    q.remove(NULL)  # pyright: ignore [reportGeneralTypeIssues]
+        q[t_] = NULL  # pyright: ignore [reportGeneralTypeIssues]
+        q.insert(insert, ins)
+        q.remove(NULL)  # pyright: ignore [reportGeneralTypeIssues]
 
-    await set_data(ctx.guild_id, lvc, d)
     return ins
 
 
@@ -6,23 +6,25 @@ import contextlib as ctxlib
 import hikari as hk
 import tanjun as tj
 import alluka as al
-import src.lib.globs as globs
 
 from hikari.permissions import Permissions as hkperms
 from hikari.messages import MessageFlag as msgflag
 
 from .consts import TIMEOUT, Q_CHUNK  # pyright: ignore [reportUnusedImport]
+from .consts import PERMS_CACHE_SIZE, PERMS_CACHE_TTL
+from . import globs
 from .errors import BaseLyraException
 from .extras import (
     Option,
     VoidCoro,
+    TTLCache,
     format_flags,
     join_and,
     URLstr,
     limit_bytes_img_size,
-    url_to_bytesio,
+    url_to_bytes,
 )
-from .dataimpl import LyraDBCollectionType
+from .dataimpl import GuildConfigCache
 
 
 _T = t.TypeVar('_T')
@@ -72,6 +74,11 @@ guild_c = tj.checks.GuildCheck(
     error_message="🙅 Commands can only be used in guild channels"
 )
 
+perms_cache: t.Final[
+    dict[hk.Snowflakeish, TTLCache[tuple[hk.Snowflakeish, hk.Snowflakeish], hkperms]]
+] = {}
+"""Resolved member permissions by guild, then by member and channel, so that an update only has to look through its own guild's entries"""
+
 RESTRICTOR = hkperms.MANAGE_CHANNELS | hkperms.MANAGE_ROLES
 DJ_PERMS: t.Final = hkperms.MOVE_MEMBERS
 dj_perms_fmt: t.Final = format_flags(DJ_PERMS)
@@ -483,28 +490,19 @@ def with_message_command_group_template(func: t.Callable[_P_mgT, VoidCoro], /):
 
 
 async def restricts_c(
-    ctx: tj.abc.Context, /, *, cfg: al.Injected[LyraDBCollectionType]
+    ctx: tj.abc.Context, /, *, cfg: al.Injected[GuildConfigCache]
 ) -> bool:
     assert ctx.guild_id and ctx.member
 
-    g_cfg = cfg.find_one({'id': str(ctx.guild_id)})
-    assert g_cfg
-
-    res_ch: dict[str, t.Any] = g_cfg.get('restricted_ch', {})
-    res_r: dict[str, t.Any] = g_cfg.get('restricted_r', {})
-    res_u: dict[str, t.Any] = g_cfg.get('restricted_u', {})
-
-    ch_wl = res_ch.get('wl_mode', 0)
-    r_wl = res_r.get('wl_mode', 0)
-    u_wl = res_u.get('wl_mode', 0)
+    res = await cfg.get_restrictions(ctx.guild_id)
+    if not res.is_active:
+        return True
 
-    res_ch_all: set[int] = {*(map(int, res_ch.setdefault('all', [])))}
-    res_r_all: set[int] = {*(map(int, res_r.setdefault('all', [])))}
-    res_u_all: set[int] = {*(map(int, res_u.setdefault('all', [])))}
+    ch_wl, res_ch_all = res.channels.wl_mode, res.channels.all
+    r_wl, res_r_all = res.roles.wl_mode, res.roles.all
+    u_wl, res_u_all = res.users.wl_mode, res.users.all
 
-    author_perms = await tj.utilities.fetch_permissions(
-        ctx.client, ctx.member, channel=ctx.channel_id
-    )
+    author_perms = await fetch_permissions(ctx)
 
     if author_perms & (hkperms.ADMINISTRATOR | RESTRICTOR):
         return True
@@ -580,17 +578,9 @@ async def on_error(ctx: tj.abc.Context, error: Exception) -> bool:
 
 @base_h.with_pre_execution
 async def pre_execution(
-    ctx: tj.abc.Context, cfg: al.Injected[LyraDBCollectionType]
+    ctx: tj.abc.Context, cfg: al.Injected[GuildConfigCache]
 ) -> None:
-    g_id = str(ctx.guild_id)
-    flt = {'id': g_id}
-
-    # pyright: reportUnknownMemberType=false
-    if _g_cfg := cfg.find_one(flt):
-        g_cfg = _g_cfg
-    else:
-        cfg.insert_one(flt)
-        g_cfg: dict[str, t.Any] = flt.copy()
+    g_cfg = await cfg.get(ctx.guild_id) if ctx.guild_id else {}
 
     if not g_cfg.get('auto_hide_embeds', True) or not isinstance(
         ctx, tj.abc.MessageContext
@@ -599,15 +589,7 @@ async def pre_execution(
 
     assert ctx.guild_id and ctx.cache
 
-    bot_u = ctx.cache.get_me()
-    assert bot_u
-
-    bot_m = ctx.cache.get_member(ctx.guild_id, bot_u)
-    assert bot_m
-
-    bot_perms = await tj.utilities.fetch_permissions(
-        ctx.client, bot_m, channel=ctx.channel_id
-    )
+    bot_perms = await fetch_my_permissions(ctx)
     if bot_perms & hkperms.MANAGE_MESSAGES:
         await ctx.message.edit(flags=msgflag.SUPPRESS_EMBEDS)
 
@@ -629,13 +611,52 @@ def get_pref(ctx: Contextish, /):
     return ';;'
 
 
+async def fetch_member_permissions(
+    client: tj.abc.Client, member: hk.Member, /, *, channel: hk.Snowflakeish
+) -> hk.Permissions:
+    key = (member.id, channel)
+    if (g_cache := perms_cache.get(member.guild_id)) is None:
+        g_cache = perms_cache[member.guild_id] = TTLCache(
+            PERMS_CACHE_SIZE, PERMS_CACHE_TTL
+        )
+    elif (perms := g_cache.get(key)) is not None:
+        return perms
+
+    perms = await tj.utilities.fetch_permissions(client, member, channel=channel)
+    g_cache.set(key, perms)
+    return perms
+
+
+def invalidate_permissions(
+    guild: hk.Snowflakeish,
+    /,
+    *,
+    member: Option[hk.Snowflakeish] = None,
+    channel: Option[hk.Snowflakeish] = None,
+) -> None:
+    if member is None and channel is None:
+        perms_cache.pop(guild, None)
+        return
+    if (g_cache := perms_cache.get(guild)) is None:
+        return
+    g_cache.pop_where(
+        lambda k: (member is None or k[0] == member)
+        and (channel is None or k[1] == channel)
+    )
+
+
 async def fetch_permissions(ctx_: Contextish, /) -> hk.Permissions:
     if isinstance(ctx_, tj.abc.Context):
+        cached = ctx_.get_cached_result(fetch_permissions)
+        if not isinstance(cached, al.abc.Undefined):
+            return cached
+
         member = ctx_.member
         assert member
-        auth_perms = await tj.utilities.fetch_permissions(
+        auth_perms = await fetch_member_permissions(
             ctx_.client, member, channel=ctx_.channel_id
         )
+        ctx_.cache_result(fetch_permissions, auth_perms)
     else:
         member = ctx_.member
         assert member
@@ -643,6 +664,24 @@ async def fetch_permissions(ctx_: Contextish, /) -> hk.Permissions:
     return auth_perms
 
 
+async def fetch_my_permissions(ctx: tj.abc.Context, /) -> hk.Permissions:
+    cached = ctx.get_cached_result(fetch_my_permissions)
+    if not isinstance(cached, al.abc.Undefined):
+        return cached
+
+    assert ctx.guild_id and ctx.cache
+
+    bot_u = ctx.cache.get_me()
+    assert bot_u
+
+    bot_m = ctx.cache.get_member(ctx.guild_id, bot_u)
+    assert bot_m
+
+    bot_perms = await fetch_member_permissions(ctx.client, bot_m, channel=ctx.channel_id)
+    ctx.cache_result(fetch_my_permissions, bot_perms)
+    return bot_perms
+
+
 def get_client(_c_inf: Option[MaybeClientInferable] = None, /) -> tj.abc.Client:
     if isinstance(_c_inf, tj.abc.Context):
         return _c_inf.client
@@ -711,11 +750,11 @@ def get_guild_upload_limit(guild: hk.Guild, /) -> int:
             raise NotImplementedError
 
 
-def limit_img_size_by_guild(
+async def limit_img_size_by_guild(
     img_url_b: URLstr | bytes, g_inf: GuildOrInferable, /, cache: hk.api.Cache
 ):
     if isinstance(img_url_b, str):
-        img_url_b = url_to_bytesio(img_url_b).getvalue()
+        img_url_b = await url_to_bytes(img_url_b)
     guild = cache.get_guild(infer_guild(g_inf))
     assert guild
-    return limit_bytes_img_size(img_url_b, get_guild_upload_limit(guild))
+    return await limit_bytes_img_size(img_url_b, get_guild_upload_limit(guild))
@@ -7,7 +7,7 @@ import alluka as al
 from hikari.permissions import Permissions as hkperms
 
 from ..lib.musicutils import init_component
-from ..lib.dataimpl import LyraDBCollectionType
+from ..lib.dataimpl import GuildConfigCache
 from ..lib.compose import Binds, with_author_permission_check, with_cmd_composer
 from ..lib.extras import flatten, fmt_str, join_and, uniquify, split_preset
 from ..lib.utils import (
@@ -79,7 +79,7 @@ async def to_multi_mentionables(value: str, /, ctx: al.Injected[tj.abc.Context])
 
 async def restrict_mode_set(
     ctx: tj.abc.Context,
-    cfg: LyraDBCollectionType,
+    cfg: GuildConfigCache,
     /,
     *,
     category: str,
@@ -88,15 +88,12 @@ async def restrict_mode_set(
 ):
     # pyright: reportUnknownMemberType=false
     assert ctx.guild_id
-    flt = {'id': str(ctx.guild_id)}
-
-    g_cfg = cfg.find_one(flt)
-    assert g_cfg
+    g_cfg = await cfg.get(ctx.guild_id)
 
     cat_name = inv_mentionables[category]
     mode_name = _c(mode)
 
-    res: dict[str, t.Any] = g_cfg.setdefault('restricted_%s' % category, {})
+    res: dict[str, t.Any] = g_cfg.get('restricted_%s' % category, {})
     if res.get('wl_mode', 0) == mode:
         await say(
             ctx,
@@ -104,9 +101,9 @@ async def restrict_mode_set(
             content=f"❕ Already set {cat_name.lower()} restricted mode to *{mode_name}*",
         )
         return
-    res['wl_mode'] = mode
+    upd: dict[str, t.Any] = {'restricted_%s.wl_mode' % category: mode}
     if wipe:
-        res.setdefault('all', []).clear()
+        upd['restricted_%s.all' % category] = []
 
     if mode == 0:
         msg = f"📝{_e(mode)}{'🧹' if wipe else ''} Cleared {cat_name.lower()} restriction mode{' and cleared all channels, roles and members from the restricted list' if wipe else ''}"
@@ -114,37 +111,34 @@ async def restrict_mode_set(
         msg = f"📝{_e(mode)} Set *{cat_name.lower()}* restriction mode to **`{mode_name}`**"
 
     await say(ctx, content=msg)
-    cfg.find_one_and_replace(flt, g_cfg)
+    await cfg.update(ctx.guild_id, {'$set': upd})
 
 
 async def restrict_list_edit(
     ctx: tj.abc.Context,
-    cfg: LyraDBCollectionType,
+    cfg: GuildConfigCache,
     /,
     *,
     mentionables: t.Collection[MentionableType],
     mode: t.Literal['+', '-'],
 ):
     assert ctx.guild_id
-    flt = {'id': str(ctx.guild_id)}
-
-    g_cfg = cfg.find_one(flt)
-    assert g_cfg
+    g_cfg = await cfg.get(ctx.guild_id)
 
-    res_ch = g_cfg.setdefault('restricted_ch', {})
-    res_r = g_cfg.setdefault('restricted_r', {})
-    res_u = g_cfg.setdefault('restricted_u', {})
+    res_ch: dict[str, t.Any] = g_cfg.get('restricted_ch', {})
+    res_r: dict[str, t.Any] = g_cfg.get('restricted_r', {})
+    res_u: dict[str, t.Any] = g_cfg.get('restricted_u', {})
 
-    res_ch_all: list[str] = res_ch.setdefault('all', [])
-    res_r_all: list[str] = res_r.setdefault('all', [])
-    res_u_all: list[str] = res_u.setdefault('all', [])
+    res_ch_all: list[str] = res_ch.get('all', [])
+    res_r_all: list[str] = res_r.get('all', [])
+    res_u_all: list[str] = res_u.get('all', [])
 
     new_ch: list[str] = []
     new_r: list[str] = []
     new_u: list[str] = []
 
     for u in uniquify(mentionables):
-        u_in_list = (u_id := u.id) in res_ch_all + res_r_all + res_u_all
+        u_in_list = str(u_id := u.id) in res_ch_all + res_r_all + res_u_all
         if u_in_list if mode == '+' else not u_in_list:
             continue
         if isinstance(u, hk.PartialChannel):
@@ -175,19 +169,19 @@ async def restrict_list_edit(
         )
     )
 
-    if mode == '+':
-        res_ch_all.extend(new_ch)
-        res_r_all.extend(new_r)
-        res_u_all.extend(new_u)
-    else:
-        *(res_ch_all.remove(ch) for ch in new_ch),
-        *(res_r_all.remove(r) for r in new_r),
-        *(res_u_all.remove(u) for u in new_u),
+    deltas = {
+        'restricted_%s.all' % cat: ({'$each': new} if mode == '+' else {'$in': new})
+        for cat, new in (('ch', new_ch), ('r', new_r), ('u', new_u))
+        if new
+    }
 
     msg = f"📝 {delta_act} {deltas_msg}" if deltas_msg else delta_txt_skipped
 
     await say(ctx, content=msg)
-    cfg.find_one_and_replace(flt, g_cfg)
+    if deltas:
+        await cfg.update(
+            ctx.guild_id, {'$addToSet' if mode == '+' else '$pull': deltas}
+        )
 
 
 ## config prefix
@@ -239,13 +233,12 @@ async def prefix_sg_m(_: tj.abc.MessageContext):
 @prefix_sg_m.with_command
 @tj.as_message_command('list', 'l', '.')
 async def prefix_list_(
-    ctx: tj.abc.Context, cfg: al.Injected[LyraDBCollectionType]
+    ctx: tj.abc.Context, cfg: al.Injected[GuildConfigCache]
 ) -> None:
     """Lists all usable prefixes of the bot"""
 
     assert ctx.guild_id
-    g_cfg = cfg.find_one({'id': str(ctx.guild_id)})
-    assert g_cfg
+    g_cfg = await cfg.get(ctx.guild_id)
 
     g_prefixes: list[str] = g_cfg.setdefault('prefixes', [])
 
@@ -277,28 +270,24 @@ async def prefix_list_(
 async def prefix_add_(
     ctx: tj.abc.Context,
     prefix: str,
-    cfg: al.Injected[LyraDBCollectionType],
+    cfg: al.Injected[GuildConfigCache],
 ):
     """Adds a new prefix of the bot for this guild"""
 
     # pyright: reportUnknownMemberType=false
     assert ctx.guild_id
-    flt = {'id': str(ctx.guild_id)}
+    g_cfg = await cfg.get(ctx.guild_id)
 
-    g_cfg = cfg.find_one(flt)
-    assert g_cfg
-
-    g_prefixes: list[str] = g_cfg.setdefault('prefixes', [])
+    g_prefixes: list[str] = g_cfg.get('prefixes', [])
 
     if prefix in g_prefixes + list(ctx.client.prefixes):
         await err_say(ctx, content=f"❗ Already defined this prefix")
         return
 
-    g_prefixes.append(prefix)
     await say(
         ctx, content=f"**`「／」+`** Added `{prefix}` as a new prefix for this guild"
     )
-    cfg.find_one_and_replace(flt, g_cfg)
+    await cfg.update(ctx.guild_id, {'$addToSet': {'prefixes': prefix}})
 
 
 ### config prefix remove
@@ -317,18 +306,15 @@ async def prefix_add_(
 async def prefix_remove_(
     ctx: tj.abc.Context,
     prefix: str,
-    cfg: al.Injected[LyraDBCollectionType],
+    cfg: al.Injected[GuildConfigCache],
 ):
     """Removes an existing prefix of the bot for this guild"""
 
     # pyright: reportUnknownMemberType=false
     assert ctx.guild_id
-    flt = {'id': str(ctx.guild_id)}
+    g_cfg = await cfg.get(ctx.guild_id)
 
-    g_cfg = cfg.find_one(flt)
-    assert g_cfg
-
-    g_prefixes: list[str] = g_cfg.setdefault('prefixes', [])
+    g_prefixes: list[str] = g_cfg.get('prefixes', [])
 
     if prefix in ctx.client.prefixes:
         await err_say(ctx, content=f"❌ This prefix is global and cannot be removed")
@@ -338,9 +324,8 @@ async def prefix_remove_(
         await err_say(ctx, content=f"❗ No such prefix found")
         return
 
-    g_prefixes.remove(prefix)
     await say(ctx, content=f"**`「／」ー`** Removed the prefix `{prefix}` for this guild")
-    cfg.find_one_and_replace(flt, g_cfg)
+    await cfg.update(ctx.guild_id, {'$pull': {'prefixes': prefix}})
 
 
 ## config nowplayingmsg
@@ -374,27 +359,58 @@ async def nowplayingmsg_sg_m(_: tj.abc.MessageContext):
 @with_author_permission_check(hkperms.MANAGE_GUILD)
 @tj.as_message_command('toggle', 'tggl', 't')
 async def nowplayingmsg_toggle_(
-    ctx: tj.abc.Context, cfg: al.Injected[LyraDBCollectionType]
+    ctx: tj.abc.Context, cfg: al.Injected[GuildConfigCache]
 ):
     """Toggles the now playing messages to be automatically sent or not"""
 
     # pyright: reportUnknownMemberType=false
     assert ctx.guild_id
-    flt = {'id': str(ctx.guild_id)}
-
-    g_cfg = cfg.find_one(flt)
-    assert g_cfg
+    g_cfg = await cfg.update(
+        ctx.guild_id,
+        [{'$set': {'send_nowplaying_msg': {'$not': ['$send_nowplaying_msg']}}}],
+    )
 
-    send_np_msg: bool = g_cfg.setdefault('send_nowplaying_msg', False)
+    send_np_msg: bool = g_cfg['send_nowplaying_msg']
 
-    g_cfg['send_nowplaying_msg'] = not send_np_msg
     msg = (
-        "🔕 Not sending now playing messages from now on"
+        "🔔 Sending now playing messages from now on"
         if send_np_msg
-        else "🔔 Sending now playing messages from now on"
+        else "🔕 Not sending now playing messages from now on"
+    )
+    await say(ctx, content=msg)
+
+
+### config nowplayingmsg edit
+
+
+@nowplayingmsg_sg_s.with_command
+@with_author_permission_check(hkperms.MANAGE_GUILD)
+@tj.as_slash_command(
+    'edit',
+    "Toggles between editing one now playing message in place or sending one per track",
+)
+#
+@nowplayingmsg_sg_m.with_command
+@with_author_permission_check(hkperms.MANAGE_GUILD)
+@tj.as_message_command('edit', 'e')
+async def nowplayingmsg_edit_(ctx: tj.abc.Context, cfg: al.Injected[GuildConfigCache]):
+    """Toggles between editing one now playing message in place or sending one per track"""
+
+    # pyright: reportUnknownMemberType=false
+    assert ctx.guild_id
+    g_cfg = await cfg.update(
+        ctx.guild_id,
+        [{'$set': {'edit_nowplaying_msg': {'$not': ['$edit_nowplaying_msg']}}}],
+    )
+
+    edit_np_msg: bool = g_cfg['edit_nowplaying_msg']
+
+    msg = (
+        "✏️ Editing a single now playing message in place from now on"
+        if edit_np_msg
+        else "📨 Sending a new now playing message for every track from now on"
     )
     await say(ctx, content=msg)
-    cfg.find_one_and_replace(flt, g_cfg)
 
 
 ## config restricts
@@ -423,12 +439,11 @@ async def restrict_sg_m(_: tj.abc.MessageContext):
 # -
 @restrict_sg_s.with_command
 @tj.as_slash_command('list', "Shows the current restricted channels, roles and members")
-async def restrict_list_(ctx: tj.abc.Context, cfg: al.Injected[LyraDBCollectionType]):
+async def restrict_list_(ctx: tj.abc.Context, cfg: al.Injected[GuildConfigCache]):
     """Shows the current restricted channels, roles and members"""
 
     assert ctx.guild_id
-    g_cfg = cfg.find_one({'id': str(ctx.guild_id)})
-    assert g_cfg
+    g_cfg = await cfg.get(ctx.guild_id)
 
     res_ch: dict[str, t.Any] = g_cfg.get('restricted_ch', {})
     res_r: dict[str, t.Any] = g_cfg.get('restricted_r', {})
@@ -484,7 +499,7 @@ async def restrict_list_(ctx: tj.abc.Context, cfg: al.Injected[LyraDBCollectionT
 async def restrict_add_(
     ctx: tj.abc.MessageContext,
     mentionables: t.Collection[MentionableType],
-    cfg: al.Injected[LyraDBCollectionType],
+    cfg: al.Injected[GuildConfigCache],
 ):
     """Adds new channels, roles or members to the restricted list"""
     await restrict_list_edit(ctx, cfg, mentionables=mentionables, mode='+')
@@ -512,7 +527,7 @@ async def restrict_add_(
 async def restrict_remove_(
     ctx: tj.abc.MessageContext,
     mentionables: t.Collection[MentionableType],
-    cfg: al.Injected[LyraDBCollectionType],
+    cfg: al.Injected[GuildConfigCache],
 ):
     """Removes existing channels, roles or members from the restricted list"""
 
@@ -537,7 +552,7 @@ async def restrict_remove_(
 )
 @tj.as_slash_command('blacklist', "Sets a category's restriction mode to blacklisting")
 async def restrict_blacklist_(
-    ctx: tj.abc.Context, category: str, cfg: al.Injected[LyraDBCollectionType]
+    ctx: tj.abc.Context, category: str, cfg: al.Injected[GuildConfigCache]
 ):
     """Sets a category's restriction mode to blacklisting"""
 
@@ -562,7 +577,7 @@ async def restrict_blacklist_(
 )
 @tj.as_slash_command('whitelist', "Sets a category's restriction mode to whitelisting")
 async def restrict_whitelist_(
-    ctx: tj.abc.Context, category: str, cfg: al.Injected[LyraDBCollectionType]
+    ctx: tj.abc.Context, category: str, cfg: al.Injected[GuildConfigCache]
 ):
     """Sets a category's restriction mode to whitelisting"""
 
@@ -591,7 +606,7 @@ async def restrict_clear_(
     ctx: tj.abc.Context,
     category: str,
     wipe: bool,
-    cfg: al.Injected[LyraDBCollectionType],
+    cfg: al.Injected[GuildConfigCache],
 ):
     """Clears a category's restriction mode"""
 
@@ -608,24 +623,23 @@ async def restrict_clear_(
 @restrict_sg_s.with_command
 @with_dangerous_restricts_cmd_check
 @tj.as_slash_command('wipe', "Wipes the restricted list of EVERY category")
-async def restrict_wipe_(ctx: tj.abc.Context, cfg: al.Injected[LyraDBCollectionType]):
+async def restrict_wipe_(ctx: tj.abc.Context, cfg: al.Injected[GuildConfigCache]):
     """Wipes the restricted list of EVERY category"""
 
     assert ctx.guild_id
-    flt = {'id': str(ctx.guild_id)}
-
-    g_cfg = cfg.find_one(flt)
-    assert g_cfg
-
-    g_cfg['restricted_ch'] = {'all': [], 'wl_mode': 0}
-    g_cfg['restricted_r'] = {'all': [], 'wl_mode': 0}
-    g_cfg['restricted_u'] = {'all': [], 'wl_mode': 0}
-
     await say(
         ctx,
         content="📝🧹 Wiped all restricted channels, roles and members list and cleared the restriction modes",
     )
-    cfg.find_one_and_replace(flt, g_cfg)
+    await cfg.update(
+        ctx.guild_id,
+        {
+            '$set': {
+                'restricted_%s' % cat: {'all': [], 'wl_mode': 0}
+                for cat in ('ch', 'r', 'u')
+            }
+        },
+    )
 
 
 # -
@@ -1,3 +1,6 @@
+import asyncio
+import contextlib as ctxlib
+
 import hikari as hk
 import tanjun as tj
 import alluka as al
@@ -19,10 +22,10 @@ from ..lib.utils import (
 )
 from ..lib.playback import stop, unstop
 from ..lib.musicutils import generate_queue_embeds, init_component
-from ..lib.errors import QueryEmpty, LyricsNotFound
-from ..lib.extras import Option, to_stamp, wr, get_lyrics
+from ..lib.errors import QueryEmpty
+from ..lib.extras import Option, LyricsData, to_stamp, wr, iter_lyrics
 from ..lib.compose import Binds, Checks, with_cmd_checks, with_cmd_composer
-from ..lib.lavautils import get_queue, access_queue
+from ..lib.lavautils import access_queue, auto_search_tracks, get_queue
 
 
 info = init_component(__name__)
@@ -79,10 +82,10 @@ async def nowplaying_(
         .replace('─', '▬', progress),
     )
 
-    color = None if q.is_paused else q.curr_t_palette[1]
+    color = None if q.is_paused else (await q.curr_t_palette())[1]
 
-    if thumb := q.curr_t_thumbnail:
-        thumb = limit_img_size_by_guild(thumb, ctx, ctx.cache)
+    if thumb := await q.curr_t_thumbnail():
+        thumb = await limit_img_size_by_guild(thumb, ctx, ctx.cache)
     embed = (
         hk.Embed(
             title=f"{'🎶 ' if not q.is_paused else ''}{t_info.title}",
@@ -161,7 +164,7 @@ async def _search(ctx: EitherContext, query: str, lvc: lv.Lavalink) -> None:
     assert bot
 
     async with trigger_thinking(ctx):
-        results = await lvc.auto_search_tracks(query)
+        results = await auto_search_tracks(lvc, query)
     if results.load_type in {'TRACK_LOADED', 'PLAYLIST_LOADED'}:
         await play(ctx, lvc, tracks=results, respond=True)
         await say(
@@ -502,23 +505,36 @@ async def lyrics_(
         erf['exit_b']
     )
 
-    try:
-        async with trigger_thinking(ctx):
-            lyrics = await get_lyrics(song)
-    except LyricsNotFound:
-        await err_say(ctx, content=f"❓ Could not find any lyrics for the song")
-        return
+    def build_embed(ly: LyricsData, /) -> hk.Embed:
+        return (
+            hk.Embed(
+                title='🎤 ' + ly.title,
+                description=ly.lyrics
+                if len(ly.lyrics) <= 4_096
+                else (
+                    wr(
+                        ly.lyrics,
+                        4_096,
+                        '...'
+                        if not ly.url
+                        else f"{wr(ly.lyrics, 3_996, '...')}\n\n🔺 **View full lyrics on the link in the title**",
+                    )
+                ),
+                url=ly.url,
+            )
+            .set_thumbnail(ly.thumbnail)
+            .set_author(name=ly.artist, icon=ly.artist_icon, url=ly.artist_url)
+            .set_footer(ly.source, icon=erf[ly.source.casefold()].url)
+        )
 
-    for source in lyrics:
+    def add_option(ly: LyricsData, /) -> None:
         (
-            ly_sel.add_option(source, source)
-            .set_emoji(erf[source.casefold()])
-            .set_description(f"The lyrics fetched from {source}")
+            ly_sel.add_option(ly.source, ly.source)
+            .set_emoji(erf[ly.source.casefold()])
+            .set_description(f"The lyrics fetched from {ly.source}")
             .add_to_menu()
         )
 
-    icons: tuple[str] = (*(erf[source.casefold()].url for source in lyrics),)
-
     # (
     #     ly_sel.add_option('Cancel', 'cancel')
     #     .set_emoji('❌')
@@ -526,27 +542,16 @@ async def lyrics_(
     #     .add_to_menu()
     # )
 
-    embeds = {
-        ly.source: hk.Embed(
-            title='🎤 ' + ly.title,
-            description=ly.lyrics
-            if len(ly.lyrics) <= 4_096
-            else (
-                wr(
-                    ly.lyrics,
-                    4_096,
-                    '...'
-                    if not ly.url
-                    else f"{wr(ly.lyrics, 3_996, '...')}\n\n🔺 **View full lyrics on the link in the title**",
-                )
-            ),
-            url=ly.url,
-        )
-        .set_thumbnail(ly.thumbnail)
-        .set_author(name=ly.artist, icon=ly.artist_icon, url=ly.artist_url)
-        .set_footer(ly.source, icon=i)
-        for ly, i in zip(lyrics.values(), icons)
-    }
+    ## Show the quickest provider's lyrics first, then add the others to the menu as they arrive
+    results = iter_lyrics(song)
+    async with trigger_thinking(ctx):
+        first = await anext(results, None)
+    if not first:
+        await err_say(ctx, content=f"❓ Could not find any lyrics for the song")
+        return
+
+    embeds = {first.source: build_embed(first)}
+    add_option(first)
 
     ly_sel.set_placeholder("Select a Lyric source")
 
@@ -555,39 +560,56 @@ async def lyrics_(
     msg = await say(
         ctx,
         ensure_result=True,
-        embed=next(iter(embeds.values())),
+        embed=embeds[first.source],
         components=[sel_row, act_row],
     )
 
-    with bot.stream(hk.InteractionCreateEvent, timeout=TIMEOUT).filter(
-        lambda e: isinstance(e.interaction, hk.ComponentInteraction)
-        and e.interaction.message == msg
-        and e.interaction.user.id == ctx.author.id
-    ) as stream:
-        _last_sel: Option[str] = None
-        async for event in stream:
-            inter = event.interaction
-            assert isinstance(inter, hk.ComponentInteraction)
-            await inter.create_initial_response(
-                hk.ResponseType.DEFERRED_MESSAGE_UPDATE,
-            )
+    async def add_later_results():
+        async for ly in results:
+            if ly.source in embeds:
+                continue
+            embeds[ly.source] = build_embed(ly)
+            add_option(ly)
+            with ctxlib.suppress(hk.NotFoundError):
+                await ctx.edit_initial_response(components=[sel_row, act_row])
 
-            sel = next(iter(inter.values), None)
-            key = inter.custom_id
+    ## The menu stays usable while the slower providers are still being waited on
+    adding = asyncio.create_task(add_later_results())
 
-            if key == 'delete':
-                await inter.delete_initial_response()
-                return
+    try:
+        with bot.stream(hk.InteractionCreateEvent, timeout=TIMEOUT).filter(
+            lambda e: isinstance(e.interaction, hk.ComponentInteraction)
+            and e.interaction.message == msg
+            and e.interaction.user.id == ctx.author.id
+        ) as stream:
+            _last_sel: Option[str] = None
+            async for event in stream:
+                inter = event.interaction
+                assert isinstance(inter, hk.ComponentInteraction)
+                await inter.create_initial_response(
+                    hk.ResponseType.DEFERRED_MESSAGE_UPDATE,
+                )
 
-            assert sel is not None
-            if sel == _last_sel:
-                continue
-            _last_sel = sel
-            await inter.edit_initial_response(embed=embeds[sel])
+                sel = next(iter(inter.values), None)
+                key = inter.custom_id
 
-        await ctx.edit_initial_response(
-            components=(*disable_components(ctx.rest, sel_row),)
-        )
+                if key == 'delete':
+                    adding.cancel()
+                    await inter.delete_initial_response()
+                    return
+
+                assert sel is not None
+                if sel == _last_sel:
+                    continue
+                _last_sel = sel
+                await inter.edit_initial_response(embed=embeds[sel])
+
+            adding.cancel()
+            await ctx.edit_initial_response(
+                components=(*disable_components(ctx.rest, sel_row),)
+            )
+    finally:
+        adding.cancel()
 
     # with cProfile.Profile() as pr:
     #     await f()
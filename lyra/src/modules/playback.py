@@ -20,8 +20,7 @@ from ..lib.errors import (
     IllegalArgument,
 )
 from ..lib.lavautils import (
-    get_data,
-    set_data,
+    access_data,
     get_queue,
     access_queue,
 )
@@ -257,27 +256,26 @@ async def play_at_(
 ):
     assert ctx.guild_id
 
-    d = await get_data(ctx.guild_id, lvc)
-    q = d.queue
-    q.reset_repeat()
-    if not (1 <= position <= len(q)):
-        await err_say(
-            ctx,
-            content=f"❌ Invalid position. **The position must be between `1` and `{len(q)}`**",
-        )
-        return
+    async with access_data(ctx, lvc) as d:
+        q = d.queue
+        q.reset_repeat()
+        if not (1 <= position <= len(q)):
+            await err_say(
+                ctx,
+                content=f"❌ Invalid position. **The position must be between `1` and `{len(q)}`**",
+            )
+            return
 
-    async with while_stop(ctx, lvc, d):
-        t = q[position - 1]
-        q.pos = position - 1
-        await lvc.play(ctx.guild_id, t.track).start()
-        await set_pause(ctx, lvc, pause=False)
+        async with while_stop(ctx, lvc, d):
+            t = q[position - 1]
+            q.pos = position - 1
+            await lvc.play(ctx.guild_id, t.track).start()
+            await set_pause(ctx, lvc, pause=False)
 
     await say(
         ctx,
         content=f"🎿 Playing the track at position `{position}` (`{t.track.info.title}`)",
     )
-    await set_data(ctx.guild_id, lvc, d)
 
 
 # Next
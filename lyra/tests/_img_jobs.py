@@ -0,0 +1,24 @@
+"""Jobs for the image workers in the tests, which have to be importable from the workers"""
+
+import os
+import sys
+import pathlib as pl
+
+
+def square(x: int, /) -> int:
+    return x * x
+
+
+def die() -> None:
+    os._exit(1)
+
+
+def die_once(flag: str, /) -> str:
+    if not os.path.exists(flag):
+        pl.Path(flag).touch()
+        os._exit(1)
+    return 'survived'
+
+
+def imported_modules() -> list[str]:
+    return [*sys.modules]
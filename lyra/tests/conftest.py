@@ -0,0 +1,92 @@
+import os
+import sys
+import types
+import typing as t
+import pathlib as pl
+import threading
+import http.server
+
+import pytest
+
+sys.path.insert(0, str(pl.Path(__file__).parents[1]))
+
+## Registers `src/lib` as a package of its own, as importing `src.lib` starts the whole bot from `src/__init__.py`
+_lib = types.ModuleType('_lyra_lib')
+_lib.__path__ = [str(pl.Path(__file__).parents[1] / 'src' / 'lib')]
+sys.modules.setdefault('_lyra_lib', _lib)
+
+## `dataimpl` builds its (lazily connecting) MongoDB client on import
+os.environ.setdefault('MONGODB_CONN_STR', 'mongodb://lyra:%s@127.0.0.1:27017')
+os.environ.setdefault('MONGODB_PWD', 'lyra')
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serves `server.files`, honouring single `Range` requests only if `server.ranges` is set"""
+
+    server: '_Server'
+
+    def log_message(self, *_: t.Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.server.requests.append((self.path, self.headers.get('Range')))
+        if (body := self.server.files.get(self.path.split('?')[0])) is None:
+            self.send_error(404)
+            return
+
+        if self.server.ranges and (rng := self.headers.get('Range')):
+            start_s, _, end_s = rng.removeprefix('bytes=').partition('-')
+            start = int(start_s)
+            end = min(int(end_s) if end_s else len(body) - 1, len(body) - 1)
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+            body = body[start : end + 1]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            ## clients reading only the start of a file hang up early
+            pass
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *, ranges: bool) -> None:
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.files: dict[str, bytes] = {}
+        self.ranges = ranges
+        self.requests: list[tuple[str, t.Optional[str]]] = []
+
+    def url(self, path: str, /) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+def _serve(*, ranges: bool) -> t.Iterator[_Server]:
+    server = _Server(ranges=ranges)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def http_server() -> t.Iterator[_Server]:
+    """A local HTTP server for its `files` which serves byte ranges"""
+    yield from _serve(ranges=True)
+
+
+@pytest.fixture
+def plain_http_server() -> t.Iterator[_Server]:
+    """A local HTTP server for its `files` which ignores `Range` and always sends them whole"""
+    yield from _serve(ranges=False)
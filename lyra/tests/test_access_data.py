@@ -0,0 +1,128 @@
+"""Compares the command path overhead of `access_data` before and after the local `NodeData` registry
+
+Run `python -m tests.test_access_data` from `lyra` to print the timings
+"""
+
+import time
+import asyncio
+import importlib
+import contextlib as ctxlib
+
+import pytest
+
+for _dep in ('hikari', 'tanjun', 'lavasnek_rs'):
+    pytest.importorskip(_dep)
+
+lavautils = importlib.import_module('_lyra_lib.lavautils')
+errors = importlib.import_module('_lyra_lib.errors')
+
+ACCESSES = 2_000
+GUILD = 1234
+
+
+class FakeNode:
+    def __init__(self, calls: dict[str, int]) -> None:
+        self.calls = calls
+        self.data = None
+
+    def get_data(self):
+        self.calls['get_data'] += 1
+        return self.data
+
+    def set_data(self, data) -> None:
+        self.calls['set_data'] += 1
+        self.data = data
+
+
+class FakeLavalink:
+    """Counts the calls that cross into lavasnek, each costing a trip through the event loop like the real futures do"""
+
+    def __init__(self) -> None:
+        self.calls = dict.fromkeys(('get_guild_node', 'get_data', 'set_data'), 0)
+        self.node = FakeNode(self.calls)
+
+    async def get_guild_node(self, guild: int, /):
+        self.calls['get_guild_node'] += 1
+        await asyncio.sleep(0)
+        return self.node
+
+
+## How get_data, set_data and access_data worked before the registry
+async def _old_get_data(guild, lvc, /):
+    node = await lvc.get_guild_node(guild)
+    if not node:
+        raise errors.NotConnected
+    data = node.get_data() or lavautils.NodeData()
+    assert isinstance(data, lavautils.NodeData)
+    return data
+
+
+async def _old_set_data(guild, lvc, data, /) -> None:
+    node = await lvc.get_guild_node(guild)
+    if not node:
+        raise errors.NotConnected
+    node.set_data(data)
+
+
+@ctxlib.asynccontextmanager
+async def old_access_data(guild, lvc, /):
+    data = await _old_get_data(guild, lvc)
+    async with data.lock.hold():
+        try:
+            yield data
+        finally:
+            await _old_set_data(guild, lvc, data)
+
+
+def bench(access) -> tuple[float, dict[str, int]]:
+    lvc = FakeLavalink()
+
+    async def main():
+        start = time.perf_counter()
+        for _ in range(ACCESSES):
+            async with access(GUILD, lvc) as data:
+                data.dc_on_purpose = not data.dc_on_purpose
+        return time.perf_counter() - start
+
+    try:
+        took = asyncio.run(main())
+    finally:
+        lavautils.release_data(GUILD)
+    return took, lvc.calls
+
+
+def test_access_data_crosses_into_lavasnek_once():
+    _, calls = bench(lavautils.access_data)
+    assert calls == {'get_guild_node': 1, 'get_data': 1, 'set_data': 1}
+
+
+def test_access_data_keeps_the_state_between_accesses():
+    lvc = FakeLavalink()
+
+    async def main():
+        async with lavautils.access_data(GUILD, lvc) as data:
+            data.out_channel_id = 42
+        async with lavautils.access_data(GUILD, lvc) as data:
+            return data.out_channel_id
+
+    try:
+        assert asyncio.run(main()) == 42
+    finally:
+        lavautils.release_data(GUILD)
+
+
+def test_access_data_is_faster_than_before():
+    old_t, old_calls = bench(old_access_data)
+    new_t, _ = bench(lavautils.access_data)
+
+    assert old_calls['get_guild_node'] == 2 * ACCESSES
+    assert new_t < old_t
+
+
+if __name__ == '__main__':
+    for name, access in (('before', old_access_data), ('after', lavautils.access_data)):
+        took, calls = bench(access)
+        print(
+            f"{name:<7} {took / ACCESSES * 1e6:>7.2f}us per access, "
+            + ', '.join(f'{k}: {v}' for k, v in calls.items())
+        )
@@ -0,0 +1,130 @@
+import struct
+import asyncio
+import importlib
+
+import pytest
+
+for _dep in ('lavasnek_rs', 'aiohttp'):
+    pytest.importorskip(_dep)
+mutagen = pytest.importorskip('mutagen')
+
+untyped = importlib.import_module('_lyra_lib._extras_untyped')
+http = importlib.import_module('_lyra_lib._extras_http')
+
+PROBE = untyped.ALBUM_ART_PROBE_BYTES
+ART = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 160
+"""A picture larger than the probe, so that reading it takes another range request"""
+
+
+def box(kind: bytes, payload: bytes = b'', /) -> bytes:
+    return struct.pack('>I', 8 + len(payload)) + kind + payload
+
+
+def id3_sample() -> bytes:
+    apic = b'\x00image/png\x00\x03\x00' + ART
+    frames = b'APIC' + struct.pack('>I', len(apic)) + b'\x00\x00' + apic
+    size = len(frames)
+    syncsafe = bytes((size >> s) & 0x7F for s in (21, 14, 7, 0))
+    ## MPEG-1 layer III frames at 128 kbit/s and 44.1 kHz
+    audio = (b'\xff\xfb\x90\x00' + bytes(413)) * 200
+    return b'ID3\x03\x00\x00' + syncsafe + frames + audio
+
+
+def flac_sample() -> bytes:
+    streaminfo = (
+        struct.pack('>HH', 4096, 4096)
+        + bytes(6)
+        + struct.pack('>Q', 44100 << 44 | 1 << 41 | 15 << 36)
+        + bytes(16)
+    )
+    mime = b'image/png'
+    picture = (
+        struct.pack('>II', 3, len(mime))
+        + mime
+        + struct.pack('>IIIIII', 0, 1, 1, 24, 0, len(ART))
+        + ART
+    )
+    return (
+        b'fLaC'
+        + bytes([0])
+        + len(streaminfo).to_bytes(3, 'big')
+        + streaminfo
+        + bytes([0x80 | 6])
+        + len(picture).to_bytes(3, 'big')
+        + picture
+        + bytes(64 * 2**10)
+    )
+
+
+def mp4_sample(*, truncated: bool = False) -> bytes:
+    ftyp = box(b'ftyp', b'M4A ' + bytes(4) + b'M4A ')
+    mdat = box(b'mdat', bytes(64 * 2**10))
+    if truncated:
+        ## claims to run on past the end of the file
+        return ftyp + struct.pack('>I', len(mdat) + 4096) + mdat[4:]
+
+    mvhd = box(b'mvhd', bytes(12) + struct.pack('>II', 1000, 0) + bytes(80))
+    trak = box(
+        b'trak',
+        box(
+            b'mdia',
+            box(b'mdhd', bytes(12) + struct.pack('>II', 1000, 0) + bytes(4))
+            + box(b'hdlr', bytes(8) + b'soun' + bytes(13))
+            + box(b'minf', box(b'stbl', box(b'stsd', bytes(8)))),
+        ),
+    )
+    ## the data box holds a 4 bytes type indicator (14 for PNG) and a 4 bytes locale
+    covr = box(b'covr', box(b'data', struct.pack('>I', 14) + bytes(4) + ART))
+    udta = box(b'udta', box(b'meta', bytes(4) + box(b'ilst', covr)))
+    return ftyp + mdat + box(b'moov', mvhd + trak + udta)
+
+
+SAMPLES = {
+    '/id3.mp3': id3_sample(),
+    '/cover.flac': flac_sample(),
+    '/cover.m4a': mp4_sample(),
+}
+
+
+def read_art(url: str, /):
+    async def main():
+        try:
+            return await untyped.get_url_audio_album_art(url)
+        finally:
+            await http.close_http_session()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize('path', [*SAMPLES])
+def test_reads_art_with_range_requests(http_server, path: str):
+    http_server.files[path] = SAMPLES[path]
+
+    assert read_art(http_server.url(path)) == ART
+    ## only ranges were fetched, adding up to less than the whole file
+    ranges = [rng for _, rng in http_server.requests]
+    assert all(ranges)
+    spans = (rng.removeprefix('bytes=').split('-') for rng in ranges)
+    assert sum(int(end) - int(start) + 1 for start, end in spans) < len(SAMPLES[path])
+
+
+@pytest.mark.parametrize('path', [*SAMPLES])
+def test_falls_back_to_the_whole_file_without_range_support(
+    plain_http_server, path: str
+):
+    plain_http_server.files[path] = SAMPLES[path]
+
+    assert read_art(plain_http_server.url(path)) == ART
+
+
+def test_a_range_past_the_end_falls_back_to_the_whole_file(http_server):
+    http_server.files['/truncated.m4a'] = mp4_sample(truncated=True)
+
+    try:
+        assert read_art(http_server.url('/truncated.m4a')) is None
+    except mutagen.MutagenError:
+        ## mutagen may well reject the truncated file too
+        pass
+
+    ranges = [rng for _, rng in http_server.requests]
+    assert ranges[-1] is None, "the 416 did not lead to the full download"
@@ -0,0 +1,113 @@
+import asyncio
+import importlib
+
+caches = importlib.import_module('_lyra_lib._extras_caches')
+
+
+def blob(n: int, fill: bytes = b'x') -> bytes:
+    return fill * n
+
+
+def test_sized_cache_evicts_least_recently_used_beyond_its_budget():
+    cache = caches.SizedLRUCache(3_000)
+    for k in 'abc':
+        cache.set(k, blob(900))
+    cache.get('a')
+    cache.set('d', blob(900))
+
+    assert cache.get('b') is None
+    assert all(cache.get(k) for k in 'acd')
+    assert cache.bytes <= cache.max_bytes
+    assert cache.stats.evictions == 1
+
+
+def test_sized_cache_tracks_its_bytes_through_replaces_and_pops():
+    cache = caches.SizedLRUCache(10_000)
+    cache.set('a', blob(1_000))
+    cache.set('a', blob(2_000))
+    assert len(cache) == 1
+    assert cache.bytes == caches.sizeof('a') + 2_000
+
+    cache.pop('a')
+    assert cache.bytes == 0
+
+    cache.set('b', blob(500))
+    cache.clear()
+    assert cache.bytes == 0 and len(cache) == 0
+
+
+def test_sized_cache_skips_values_larger_than_its_budget():
+    cache = caches.SizedLRUCache(1_000)
+    cache.set('a', blob(100))
+    cache.set('huge', blob(2_000))
+
+    assert cache.get('huge') is None
+    assert cache.get('a') == blob(100)
+    assert cache.stats.evictions == 0
+
+
+def test_sized_cache_stays_within_budget_under_churn():
+    cache = caches.SizedLRUCache(50_000)
+    for i in range(1_000):
+        cache.set(i, blob(100 + i % 7 * 1_000))
+        assert cache.bytes <= cache.max_bytes
+
+    assert cache.bytes == sum(
+        caches.sizeof(k) + caches.sizeof(cache.get(k)) for k in [*cache._data]
+    )
+
+
+def test_cache_stats_count_hits_misses_and_evictions():
+    cache = caches.TTLCache(2)
+    cache.get('a')
+    cache.set('a', 1)
+    cache.get('a')
+    cache.set('b', 2)
+    cache.set('c', 3)
+
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (1, 1, 1)
+    ## Membership checks don't skew the counters
+    assert 'c' in cache
+    assert cache.stats.hits == 1
+
+
+def test_cached_none_results_are_hits():
+    calls: list[int] = []
+
+    @caches.cached(max_bytes=1_000)
+    def lookup(x: int) -> None:
+        calls.append(x)
+
+    assert lookup(1) is None
+    assert lookup(1) is None
+    assert calls == [1]
+    stats = getattr(lookup, 'cache').stats
+    assert (stats.hits, stats.misses) == (1, 1)
+
+
+def test_acached_none_results_are_hits():
+    calls: list[int] = []
+
+    @caches.acached(16)
+    async def lookup(x: int) -> None:
+        calls.append(x)
+
+    async def main():
+        return [await lookup(1), await lookup(1), await lookup(2)]
+
+    assert asyncio.run(main()) == [None] * 3
+    assert calls == [1, 2]
+    assert getattr(lookup, 'cache').stats.hits == 1
+
+
+def test_digest_key_does_not_keep_the_bytes_alive():
+    @caches.cached(max_bytes=10_000, key=caches.digest_key)
+    def length(data: bytes, /, *, scale: int = 1) -> int:
+        return len(data) * scale
+
+    assert length(blob(5_000)) == 5_000
+    assert length(blob(5_000), scale=2) == 10_000
+    assert length(blob(5_000)) == 5_000
+    cache = getattr(length, 'cache')
+    assert (cache.stats.hits, len(cache)) == (1, 2)
+    assert cache.bytes < 1_000
@@ -0,0 +1,79 @@
+import time
+import asyncio
+import importlib
+
+import pytest
+
+for _dep in ('hikari', 'pymongo', 'lavasnek_rs'):
+    pytest.importorskip(_dep)
+
+dataimpl = importlib.import_module('_lyra_lib.dataimpl')
+
+DB_DELAY = 0.1
+"""How many seconds each stubbed database call blocks for"""
+TICK = 0.01
+"""How many seconds the ticker task sleeps between ticks"""
+MAX_LAG = 0.05
+"""How many seconds late the ticker is allowed to wake up"""
+
+
+class SlowCollection:
+    """A stand-in for a `pymongo` collection whose calls block like a slow round trip"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def find_one(self, flt: dict, /) -> dict:
+        self.calls += 1
+        time.sleep(DB_DELAY)
+        return {**flt, 'prefixes': []}
+
+    def find_one_and_update(self, flt: dict, update: dict, /, **_) -> dict:
+        return self.find_one(flt)
+
+
+async def ticker(lags: list[float], stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        before = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - before - TICK)
+
+
+def test_concurrent_lookups_do_not_stall_the_loop():
+    n = 2 * dataimpl.DB_WORKERS
+
+    async def main():
+        col = SlowCollection()
+        cfg = dataimpl.GuildConfigCache(dataimpl.AsyncCollection(col))
+
+        lags: list[float] = []
+        stop = asyncio.Event()
+        tick_t = asyncio.create_task(ticker(lags, stop))
+
+        start = time.perf_counter()
+        docs = await asyncio.gather(*(cfg.get(g) for g in range(n)))
+        took = time.perf_counter() - start
+
+        stop.set()
+        await tick_t
+        return col, docs, took, lags
+
+    col, docs, took, lags = asyncio.run(main())
+
+    assert col.calls == n
+    assert [d['id'] for d in docs] == [str(g) for g in range(n)]
+    ## The calls ran side by side on the pool instead of one after another
+    assert took < n * DB_DELAY / 2
+    assert lags and max(lags) < MAX_LAG
+
+
+def test_cached_lookups_skip_the_database():
+    async def main():
+        col = SlowCollection()
+        cfg = dataimpl.GuildConfigCache(dataimpl.AsyncCollection(col))
+        await cfg.get(1)
+        await asyncio.gather(*(cfg.get(1) for _ in range(8)))
+        return col
+
+    assert asyncio.run(main()).calls == 1
@@ -0,0 +1,74 @@
+"""Feeds many distinct images through the image caches and checks they stay within their byte budgets
+
+Set `LYRA_SOAK_IMAGES` to soak with more images than the default
+"""
+
+import io
+import os
+import asyncio
+import importlib
+
+import pytest
+
+for _dep in ('lavasnek_rs', 'aiohttp'):
+    pytest.importorskip(_dep)
+pil_img = pytest.importorskip('PIL.Image')
+
+untyped = importlib.import_module('_lyra_lib._extras_untyped')
+http = importlib.import_module('_lyra_lib._extras_http')
+
+SOAK_IMAGES = int(os.environ.get('LYRA_SOAK_IMAGES', 40))
+IMG_SIZE = (512, 512)
+BUDGET = 8 * 2**20
+"""How many bytes each cache is shrunk to for the soak, so that a few dozen images already overflow it"""
+
+
+def noise_png() -> bytes:
+    img = pil_img.frombytes('RGB', IMG_SIZE, os.urandom(IMG_SIZE[0] * IMG_SIZE[1] * 3))
+    img.save(b := io.BytesIO(), 'PNG', compress_level=1)
+    return b.getvalue()
+
+
+@pytest.fixture
+def small_budgets():
+    caches = [
+        getattr(untyped.url_to_bytes, 'cache'),
+        getattr(untyped.bytes_to_img, 'cache'),
+    ]
+    budgets = [c.max_bytes for c in caches]
+    for c in caches:
+        c.clear()
+        c.max_bytes = BUDGET
+    yield caches
+    for c, b in zip(caches, budgets):
+        c.clear()
+        c.max_bytes = b
+
+
+def test_image_caches_stay_within_budget(http_server, small_budgets):
+    url_cache, img_cache = small_budgets
+    urls = []
+    for i in range(SOAK_IMAGES):
+        http_server.files[f'/{i}.png'] = noise_png()
+        urls.append(http_server.url(f'/{i}.png'))
+
+    async def main():
+        try:
+            for url in urls:
+                img_b = await untyped.url_to_bytes(url)
+                img = untyped.bytes_to_img(img_b)
+                assert img.size == IMG_SIZE
+                assert url_cache.bytes <= url_cache.max_bytes
+                assert img_cache.bytes <= img_cache.max_bytes
+            ## The most recent image is still served from the cache
+            await untyped.url_to_bytes(urls[-1])
+        finally:
+            await http.close_http_session()
+
+    asyncio.run(main())
+
+    total = sum(map(len, http_server.files.values()))
+    assert total > BUDGET, "the soak never overflowed the budget"
+    assert url_cache.stats.evictions > 0 and img_cache.stats.evictions > 0
+    assert url_cache.stats.hits == 1
+    assert len(http_server.requests) == SOAK_IMAGES
@@ -0,0 +1,44 @@
+import asyncio
+import pathlib as pl
+import importlib
+import concurrent.futures.process as cfp
+
+import pytest
+
+for _dep in ('lavasnek_rs', 'aiohttp'):
+    pytest.importorskip(_dep)
+
+import _img_jobs as jobs
+
+untyped = importlib.import_module('_lyra_lib._extras_untyped')
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor():
+    yield
+    if untyped._img_executor:
+        untyped._img_executor.shutdown()
+        untyped._img_executor = None
+
+
+def test_a_worker_dying_once_is_retried_on_a_new_pool(tmp_path: pl.Path):
+    async def main():
+        return await untyped.run_img_task(jobs.die_once, str(tmp_path / 'died'))
+
+    assert asyncio.run(main()) == 'survived'
+
+
+def test_the_pool_is_replaced_after_it_breaks():
+    async def main():
+        with pytest.raises(cfp.BrokenProcessPool):
+            await untyped.run_img_task(jobs.die)
+        return await untyped.run_img_task(jobs.square, 3)
+
+    assert asyncio.run(main()) == 9
+
+
+def test_workers_do_not_start_the_bot():
+    async def main():
+        return await untyped.run_img_task(jobs.imported_modules)
+
+    assert not any(m == 'src' or m.startswith('src.') for m in asyncio.run(main()))
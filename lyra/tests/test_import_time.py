@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import textwrap
+import subprocess
+import pathlib as pl
+import importlib.util
+
+import pytest
+
+for _dep in ('hikari', 'tanjun', 'lavasnek_rs', 'pymongo', 'aiohttp'):
+    if importlib.util.find_spec(_dep) is None:
+        pytest.skip(f"{_dep} is not installed", allow_module_level=True)
+
+LYRA = pl.Path(__file__).parents[1]
+HEAVY = ('numpy', 'PIL', 'mutagen', 'sclib', 'ytmusicapi')
+"""Modules which only the commands using them should pull in"""
+
+CONFIG = textwrap.dedent("""\
+    prefixes: ['-']
+    dev_mode: false
+    guilds: []
+    emoji_guild: 0
+    """)
+
+
+def test_importing_the_lib_skips_heavy_modules(tmp_path: pl.Path):
+    ## `src` reads its config from `./shared` and loads its modules from `./src` when `IN_DOCKER` is set
+    (tmp_path / 'shared').mkdir()
+    (tmp_path / 'shared' / 'config.yml').write_text(CONFIG)
+    (tmp_path / 'src').symlink_to(LYRA / 'src', target_is_directory=True)
+
+    env = {
+        **os.environ,
+        'IN_DOCKER': '1',
+        'PYTHONPATH': str(LYRA),
+        'LYRA_TOKEN': 'token',
+        'MONGODB_CONN_STR': 'mongodb://lyra:%s@127.0.0.1:27017',
+        'MONGODB_PWD': 'lyra',
+    }
+    code = 'import sys, json, src.lib; print(json.dumps([*sys.modules]))'
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+
+    modules = set(json.loads(proc.stdout.splitlines()[-1]))
+    loaded = [m for m in HEAVY if m in modules]
+    assert not loaded, '\n'.join(importers(proc.stderr, loaded))
+
+
+def importers(report: str, modules: list[str], /) -> list[str]:
+    """Which module pulled in each of `modules`, going by the `-X importtime` report
+
+    The report lists a module after the ones it imported, each indented by its nesting depth
+    """
+
+    names = [line.rsplit('|', 1)[-1] for line in report.splitlines() if '|' in line]
+    found: list[str] = []
+    for i, name in enumerate(names):
+        if (mod := name.strip()) not in modules:
+            continue
+        depth = len(name) - len(name.lstrip())
+        parent = next(
+            (n.strip() for n in names[i + 1 :] if len(n) - len(n.lstrip()) < depth),
+            '?',
+        )
+        found.append(f"{mod} was imported by {parent}")
+    return found
@@ -0,0 +1,137 @@
+import types
+import asyncio
+import importlib
+
+import pytest
+
+for _dep in ('hikari', 'tanjun', 'lavasnek_rs', 'pymongo', 'aiohttp'):
+    pytest.importorskip(_dep)
+
+consts = importlib.import_module('_lyra_lib.consts')
+lavapool = importlib.import_module('_lyra_lib.lavapool')
+lavautils = importlib.import_module('_lyra_lib.lavautils')
+lavaimpl = importlib.import_module('_lyra_lib.lavaimpl')
+
+
+class FakeLavalink:
+    """Stands in for one Lavalink node, recording what the pool asks of it"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls: list[tuple[object, ...]] = []
+
+    async def get_tracks(self, query: str):
+        self.calls.append(('get_tracks', query))
+        return f'{self.name}:{query}'
+
+    async def wait_for_full_connection_info_insert(self, guild: int):
+        return types.SimpleNamespace(guild_id=guild)
+
+    async def create_session(self, conn: object):
+        self.calls.append(('create_session', conn))
+
+    async def volume(self, guild: int, volume: int):
+        self.calls.append(('volume', guild, volume))
+
+    async def equalize_all(self, guild: int, bands: list[float]):
+        self.calls.append(('equalize_all', guild, bands))
+
+    def raw_handle_event_voice_state_update(self, *args: object):
+        self.calls.append(('voice_state', *args))
+
+
+def make_pool():
+    a, b = FakeLavalink('a'), FakeLavalink('b')
+    node_a, node_b = lavapool.PoolNode('a', a), lavapool.PoolNode('b', b)
+    return lavapool.LavalinkPool([node_a, node_b]), node_a, node_b
+
+
+def stats(players: int, cpu: float = 0.0):
+    return types.SimpleNamespace(players=players, cpu_lavalink_load=cpu)
+
+
+def test_placements_spread_before_any_stats_arrive():
+    pool, node_a, node_b = make_pool()
+
+    assert pool.place(1) is node_a.lvc
+    assert pool.place(2) is node_b.lvc
+    assert pool.place(1) is node_a.lvc
+    assert (node_a.players, node_b.players) == (1, 1)
+
+    pool.release(1)
+    assert node_a.players == 0
+    assert pool.placed(1) is None
+
+
+def test_unplaced_guilds_stay_unplaced():
+    pool, node_a, node_b = make_pool()
+
+    pool.of(3)
+    pool.raw_handle_event_voice_state_update(3, 4, 'session', 5)
+
+    assert pool.placed(3) is None
+    assert not node_a.lvc.calls and not node_b.lvc.calls
+
+    pool.place(3)
+    pool.raw_handle_event_voice_state_update(3, 4, 'session', 5)
+    assert node_a.lvc.calls == [('voice_state', 3, 4, 'session', 5)]
+
+
+def test_stats_reach_their_node_whatever_lavalink_wrapper_carries_them():
+    pool, node_a, node_b = make_pool()
+    handler = lavaimpl.EventHandler(node_a)
+
+    node_a._last_seen -= consts.NODE_STATS_TIMEOUT + 1
+    assert not node_a.alive
+
+    asyncio.run(handler.stats(FakeLavalink('another wrapper'), stats(7, 0.5)))
+
+    assert node_a.alive
+    assert (node_a.players, node_a.cpu_load) == (7, 0.5)
+    assert pool.least_loaded() is node_b
+
+
+def test_dead_nodes_are_avoided():
+    pool, node_a, node_b = make_pool()
+    node_b.update(stats(50))
+    node_a._last_seen -= consts.NODE_STATS_TIMEOUT + 1
+
+    assert pool.place(1) is node_b.lvc
+
+
+def test_failover_moves_the_guild_and_its_player_state():
+    pool, node_a, node_b = make_pool()
+    pool.place(1)
+    lavautils._node_data[1] = data = lavautils.NodeData()
+    data.equalizer.volume = 7
+    node_a._last_seen -= consts.NODE_STATS_TIMEOUT + 1
+
+    try:
+        asyncio.run(pool.failover(1))
+    finally:
+        lavautils._node_data.pop(1, None)
+
+    assert pool.placed(1) is node_b
+    assert (node_a.players, node_b.players) == (0, 1)
+    kinds = [c[0] for c in node_b.lvc.calls]
+    assert kinds == ['create_session', 'volume', 'equalize_all']
+    assert node_b.lvc.calls[1] == ('volume', 1, 70)
+    assert not node_a.lvc.calls
+
+
+def test_failover_without_a_live_node_keeps_the_placement():
+    pool, node_a, node_b = make_pool()
+    pool.place(1)
+    for node in (node_a, node_b):
+        node._last_seen -= consts.NODE_STATS_TIMEOUT + 1
+
+    asyncio.run(pool.failover(1))
+    assert pool.placed(1) is node_a
+
+
+def test_guild_independent_calls_go_to_the_least_loaded_node():
+    pool, node_a, node_b = make_pool()
+    node_a.update(stats(10))
+    node_b.update(stats(2))
+
+    assert asyncio.run(pool.get_tracks('q')) == 'b:q'
@@ -0,0 +1,66 @@
+import time
+import asyncio
+import importlib
+
+import pytest
+
+for _dep in ('lavasnek_rs', 'aiohttp'):
+    pytest.importorskip(_dep)
+
+untyped = importlib.import_module('_lyra_lib._extras_untyped')
+
+
+def lyrics(source: str) -> object:
+    return untyped.LyricsData(source, 'la la la', 'Song', 'Artist', '')
+
+
+def found_by(source: str):
+    def provider(song: str, /):
+        return lyrics(source)
+
+    provider.__name__ = source
+    return provider
+
+
+def failing(song: str, /):
+    raise RuntimeError("provider is down")
+
+
+def hanging(song: str, /):
+    time.sleep(0.5)
+    return lyrics('Slow')
+
+
+@pytest.fixture(autouse=True)
+def providers(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(untyped, 'LYRICS_PROVIDER_TIMEOUT', 0.1)
+    monkeypatch.setattr(untyped, 'lyrics_cache', untyped.TTLCache(16))
+
+    def use(*providers):
+        monkeypatch.setattr(untyped, 'lyrics_providers', [*providers])
+
+    return use
+
+
+def collect(song: str) -> list[str]:
+    async def main():
+        return [ly.source async for ly in untyped.iter_lyrics(song)]
+
+    return asyncio.run(main())
+
+
+def test_caches_when_every_provider_answered(providers):
+    providers(found_by('A'), found_by('B'))
+    assert sorted(collect('song')) == ['A', 'B']
+
+    providers()
+    assert sorted(collect('song')) == ['A', 'B']
+
+
+@pytest.mark.parametrize('broken', [failing, hanging], ids=['failed', 'timed out'])
+def test_does_not_cache_when_a_provider_did_not_answer(providers, broken):
+    providers(found_by('A'), broken)
+    assert collect('song') == ['A']
+
+    providers(found_by('A'), found_by('B'))
+    assert sorted(collect('song')) == ['A', 'B']
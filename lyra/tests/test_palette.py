@@ -0,0 +1,175 @@
+"""Compares the histogram palette against the `MiniBatchKMeans` one it replaced
+
+Run `python -m tests.test_palette` from `lyra` to print the timings and color
+differences per sample
+"""
+
+import io
+import time
+import typing as t
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pil_img = pytest.importorskip('PIL.Image')
+sk_cls = pytest.importorskip('sklearn.cluster')
+
+import img_tasks
+
+N = 5
+RESIZE = (150, 150)
+RUNS = 3
+"""How many times each palette is computed, keeping the fastest run"""
+MAX_DOMINANT_DE = 15.0
+"""How far apart (CIE76 ΔE) the most dominant colors of both palettes may be"""
+MAX_MEAN_DE = 20.0
+"""How far on average each k-means color may be from the closest histogram color"""
+
+
+def _sample(blocks: list[tuple[tuple[int, int, int], float]], *, seed: int) -> bytes:
+    """A noisy 300x300 JPEG made of vertical bands of each color, sized by its share"""
+
+    rng = np.random.default_rng(seed)
+    ar = np.empty((300, 300, 3))
+    start = 0
+    for i, (color, share) in enumerate(blocks):
+        end = 300 if i == len(blocks) - 1 else start + round(share * 300)
+        ar[:, start:end] = color
+        start = end
+    ar += rng.normal(0, 8, ar.shape)
+
+    img = pil_img.fromarray(ar.clip(0, 255).astype(np.uint8))
+    img.save(b := io.BytesIO(), 'JPEG', quality=85)
+    return b.getvalue()
+
+
+def _gradient(*, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, 300)[None, :, None]
+    ar = (1 - x) * (20, 40, 120) + x * (230, 120, 40)
+    ar = np.broadcast_to(ar, (300, 300, 3)).copy()
+    ar[100:200, 100:200] = (240, 240, 230)
+    ar += rng.normal(0, 5, ar.shape)
+
+    img = pil_img.fromarray(ar.clip(0, 255).astype(np.uint8))
+    img.save(b := io.BytesIO(), 'JPEG', quality=85)
+    return b.getvalue()
+
+
+SAMPLES = {
+    'quadrants': _sample(
+        [
+            ((200, 30, 40), 0.4),
+            ((30, 60, 180), 0.3),
+            ((240, 220, 60), 0.2),
+            ((20, 20, 20), 0.1),
+        ],
+        seed=1,
+    ),
+    'dark cover': _sample(
+        [((15, 15, 25), 0.6), ((90, 20, 110), 0.25), ((250, 250, 250), 0.15)], seed=2
+    ),
+    'pastel': _sample(
+        [((250, 200, 210), 0.35), ((180, 230, 200), 0.35), ((200, 210, 250), 0.3)],
+        seed=3,
+    ),
+    'gradient': _gradient(seed=4),
+}
+
+
+def kmeans_palette(img_b: bytes, /) -> tuple[tuple[int, int, int], ...]:
+    """The palette as it was computed before the histogram binning"""
+
+    ar = np.asarray(img_tasks._open(img_b).convert('RGB').resize(RESIZE))
+    ar = ar.reshape(-1, 3).astype(float)
+
+    kmeans = sk_cls.MiniBatchKMeans(
+        n_clusters=N, init="k-means++", max_iter=20, random_state=1000
+    ).fit(ar)
+    codes = kmeans.cluster_centers_
+    counts = np.bincount(kmeans.predict(ar), minlength=len(codes))
+    return (*((*(int(c) for c in codes[i]),) for i in np.argsort(counts)[::-1]),)
+
+
+def hist_palette(img_b: bytes, /) -> tuple[tuple[int, int, int], ...]:
+    return img_tasks.compute_img_palette(img_b, N, RESIZE, 3, 48.0)
+
+
+def to_lab(rgb: t.Any, /) -> t.Any:
+    """sRGB (0-255) to CIELAB under D65"""
+
+    c = np.asarray(rgb, float) / 255
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = (
+        c
+        @ np.array(
+            [
+                [0.4124, 0.3576, 0.1805],
+                [0.2126, 0.7152, 0.0722],
+                [0.0193, 0.1192, 0.9505],
+            ]
+        ).T
+    )
+    xyz /= (0.95047, 1.0, 1.08883)
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack(
+        [
+            116 * f[..., 1] - 16,
+            500 * (f[..., 0] - f[..., 1]),
+            200 * (f[..., 1] - f[..., 2]),
+        ],
+        -1,
+    )
+
+
+def delta_e(a: t.Any, b: t.Any, /) -> t.Any:
+    return np.linalg.norm(to_lab(a) - to_lab(b), axis=-1)
+
+
+def timed(
+    palette: t.Callable[[bytes], tuple[tuple[int, int, int], ...]], img_b: bytes, /
+) -> tuple[float, tuple[tuple[int, int, int], ...]]:
+    best = float('inf')
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        res = palette(img_b)
+        best = min(best, time.perf_counter() - start)
+    return best, res  # pyright: ignore[reportUnboundVariable]
+
+
+def compare(img_b: bytes, /) -> tuple[float, float, float, float]:
+    """Returns both timings, the dominant colors' ΔE and the mean closest-color ΔE"""
+
+    km_t, km = timed(kmeans_palette, img_b)
+    h_t, h = timed(hist_palette, img_b)
+
+    dists = delta_e(np.asarray(km)[:, None], np.asarray(h)[None, :])
+    return km_t, h_t, float(dists[0, 0]), float(dists.min(1).mean())
+
+
+@pytest.mark.parametrize('name', [*SAMPLES])
+def test_histogram_palette_matches_kmeans(name: str):
+    _km_t, _h_t, dominant_de, mean_de = compare(SAMPLES[name])
+
+    assert dominant_de < MAX_DOMINANT_DE
+    assert mean_de < MAX_MEAN_DE
+
+
+def test_histogram_palette_is_faster():
+    km_t = h_t = 0.0
+    for img_b in SAMPLES.values():
+        km_t += timed(kmeans_palette, img_b)[0]
+        h_t += timed(hist_palette, img_b)[0]
+
+    assert h_t < km_t
+
+
+if __name__ == '__main__':
+    print(
+        f"{'sample':<12} {'k-means':>9} {'histogram':>10} {'dominant ΔE':>12} {'mean ΔE':>8}"
+    )
+    for name, img_b in SAMPLES.items():
+        km_t, h_t, dominant_de, mean_de = compare(img_b)
+        print(
+            f"{name:<12} {km_t * 1e3:>7.1f}ms {h_t * 1e3:>8.1f}ms {dominant_de:>12.1f} {mean_de:>8.1f}"
+        )
@@ -0,0 +1,66 @@
+import asyncio
+import importlib
+import types
+
+import pytest
+
+for _dep in ('hikari', 'tanjun', 'lavasnek_rs'):
+    pytest.importorskip(_dep)
+
+utils = importlib.import_module('_lyra_lib.utils')
+
+
+@pytest.fixture
+def fetches(monkeypatch: pytest.MonkeyPatch) -> list[tuple[int, int, int]]:
+    calls: list[tuple[int, int, int]] = []
+
+    async def fetch_permissions(client, member, /, *, channel):
+        calls.append((member.guild_id, member.id, channel))
+        return utils.hkperms.SEND_MESSAGES
+
+    monkeypatch.setattr(utils.tj.utilities, 'fetch_permissions', fetch_permissions)
+    monkeypatch.setattr(utils, 'perms_cache', {})
+    return calls
+
+
+def fetch(guild: int, member: int, channel: int):
+    m = types.SimpleNamespace(guild_id=guild, id=member)
+    return asyncio.run(utils.fetch_member_permissions(None, m, channel=channel))
+
+
+def test_permissions_are_cached_per_guild(fetches):
+    fetch(1, 10, 100)
+    fetch(1, 10, 100)
+    fetch(2, 10, 100)
+
+    assert fetches == [(1, 10, 100), (2, 10, 100)]
+    assert {*utils.perms_cache} == {1, 2}
+
+
+def test_invalidating_a_guild_drops_only_its_permissions(fetches):
+    fetch(1, 10, 100)
+    fetch(2, 10, 100)
+    utils.invalidate_permissions(1)
+
+    assert 1 not in utils.perms_cache
+    fetch(2, 10, 100)
+    assert len(fetches) == 2
+
+
+@pytest.mark.parametrize(
+    'kwargs, refetched',
+    [
+        ({'member': 10}, [(1, 10, 100), (1, 10, 200)]),
+        ({'channel': 100}, [(1, 10, 100), (1, 11, 100)]),
+    ],
+)
+def test_invalidating_a_member_or_channel(fetches, kwargs, refetched):
+    keys = [(1, 10, 100), (1, 10, 200), (1, 11, 100), (1, 11, 200)]
+    for k in keys:
+        fetch(*k)
+    utils.invalidate_permissions(1, **kwargs)
+    fetches.clear()
+
+    for k in keys:
+        fetch(*k)
+    assert fetches == refetched
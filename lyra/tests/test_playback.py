@@ -0,0 +1,37 @@
+import asyncio
+import logging
+import importlib
+
+import pytest
+
+for _dep in ('hikari', 'tanjun', 'lavasnek_rs'):
+    pytest.importorskip(_dep)
+
+lavautils = importlib.import_module('_lyra_lib.lavautils')
+playback = importlib.import_module('_lyra_lib.playback')
+
+GUILD = 1234
+
+
+@pytest.fixture
+def data(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(playback, 'TRACK_EVENT_TIMEOUT', 0.01)
+    lavautils._node_data[GUILD] = d = lavautils.NodeData()
+    yield d
+    lavautils.release_data(GUILD)
+
+
+def test_a_missing_finish_event_is_logged(data, caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(playback.wait_for_track_finish_event_fire(GUILD, None, data))
+
+    assert str(GUILD) in caplog.text
+
+
+def test_a_fired_finish_event_is_not_logged(data, caplog: pytest.LogCaptureFixture):
+    data.track_stopped.set()
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(playback.wait_for_track_finish_event_fire(GUILD, None, data))
+
+    assert not caplog.records
+    assert not data.track_stopped.is_set()
@@ -0,0 +1,49 @@
+import importlib
+
+import pytest
+
+for _dep in ('hikari', 'tanjun', 'lavasnek_rs'):
+    pytest.importorskip(_dep)
+
+lavautils = importlib.import_module('_lyra_lib.lavautils')
+
+
+class Track:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+def make_queue(*names: str):
+    return lavautils.QueueList.from_seq([Track(n) for n in names])
+
+
+def names(q) -> list[str]:
+    return [t.name for t in q]
+
+
+def test_ext_after_keeps_a_playlist_ahead_of_later_tracks():
+    q = make_queue('p1', 'p2', 'other')
+    q.ext_after(q[1], Track('p3'), Track('p4'))
+
+    assert names(q) == ['p1', 'p2', 'p3', 'p4', 'other']
+
+
+def test_ext_after_never_inserts_before_the_current_track():
+    q = make_queue('p1', 'p2', 'other', 'next')
+    q.pos = 2
+    q.ext_after(q[1], Track('p3'))
+
+    assert names(q) == ['p1', 'p2', 'other', 'p3', 'next']
+    assert q.current.name == 'other'
+
+
+def test_ext_after_appends_once_the_anchor_is_gone():
+    q = make_queue('p1', 'p2', 'other')
+    anchor = q[1]
+    q.sub(anchor)
+    q.ext_after(anchor, Track('p3'))
+
+    assert names(q) == ['p1', 'other', 'p3']
@@ -0,0 +1,74 @@
+import asyncio
+import importlib
+
+import pytest
+
+
+caches = importlib.import_module('_lyra_lib._extras_caches')
+
+
+class FakeLoader:
+    def __init__(self, result: object = 'tracks', *, delay: float = 0.05):
+        self.calls = 0
+        self.result = result
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.result
+
+
+def make_loads(**kwargs: object):
+    return caches.SingleflightCache(caches.TTLCache(16), **kwargs)
+
+
+@pytest.mark.parametrize('n', [2, 50])
+def test_concurrent_identical_lookups_load_once(n: int):
+    loads = make_loads()
+    loader = FakeLoader()
+
+    async def main():
+        return await asyncio.gather(*(loads.get('q', loader) for _ in range(n)))
+
+    assert asyncio.run(main()) == ['tracks'] * n
+    assert loader.calls == 1
+
+
+def test_results_are_cached_after_loading():
+    loads = make_loads()
+    loader = FakeLoader()
+
+    async def main():
+        await loads.get('q', loader)
+        return await loads.get('q', loader)
+
+    assert asyncio.run(main()) == 'tracks'
+    assert loader.calls == 1
+
+
+def test_rejected_results_are_not_cached():
+    loads = make_loads(keep=bool)
+    loader = FakeLoader('')
+
+    async def main():
+        await loads.get('q', loader)
+        await loads.get('q', loader)
+
+    asyncio.run(main())
+    assert loader.calls == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_load():
+    loads = make_loads()
+    loader = FakeLoader()
+
+    async def main():
+        first = asyncio.create_task(loads.get('q', loader))
+        second = asyncio.create_task(loads.get('q', loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 'tracks'
+    assert loader.calls == 1
@@ -0,0 +1,59 @@
+import asyncio
+import importlib
+
+import pytest
+
+for _dep in ('hikari', 'pymongo', 'lavasnek_rs'):
+    pytest.importorskip(_dep)
+
+dataimpl = importlib.import_module('_lyra_lib.dataimpl')
+
+
+class FakeCollection:
+    def __init__(self, *, fail: bool = False) -> None:
+        self.docs: list[dict] = []
+        self.calls: list[str] = []
+        self.fail = fail
+
+    def find(self, flt=None, /):
+        self.calls.append('find')
+        return [*self.docs]
+
+    def update_one(self, flt: dict, update: dict, /, *, upsert: bool = False):
+        self.calls.append('update_one')
+        if self.fail:
+            raise ConnectionError("database is down")
+        if not any(d.items() >= flt.items() for d in self.docs) and upsert:
+            self.docs.append({**flt, **update.get('$setOnInsert', {})})
+
+
+def make_upt(col: FakeCollection):
+    return dataimpl.UnplayableTracks(dataimpl.AsyncCollection(col))
+
+
+def test_adding_upserts_once():
+    col = FakeCollection()
+    upt = make_upt(col)
+
+    async def main():
+        await upt.add('abc')
+        await upt.add('abc')
+
+    asyncio.run(main())
+    assert 'abc' in upt
+    assert col.calls == ['update_one']
+    assert col.docs == [{'identifier': 'abc'}]
+
+
+def test_a_failed_write_leaves_the_track_playable():
+    col = FakeCollection(fail=True)
+    upt = make_upt(col)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(upt.add('abc'))
+    assert 'abc' not in upt
+
+    col.fail = False
+    asyncio.run(upt.add('abc'))
+    assert 'abc' in upt
+    assert col.docs == [{'identifier': 'abc'}]